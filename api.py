@@ -0,0 +1,97 @@
+import threading
+
+# The converter modules and move_resolver register their stages when they are imported
+try:
+    import scripts.source_data.converters.other as other
+    import scripts.source_data.converters.moves as moves
+    import scripts.source_data.converters.pokemon as pokemon
+    import scripts.source_data.util.move_resolver as move_resolver
+    import scripts.source_data.util.registry as registry
+    import scripts.source_data.util.util as util
+    from scripts.source_data.util.sinks import JsonSink, LevelTablesSink, SqliteSink, BundleSink
+except ModuleNotFoundError:
+    import converters.other as other
+    import converters.moves as moves
+    import converters.pokemon as pokemon
+    import util.move_resolver as move_resolver
+    import util.registry as registry
+    import util.util as util
+    from util.sinks import JsonSink, LevelTablesSink, SqliteSink, BundleSink
+
+class Dataset:
+    """Everything converted from one set of sheets, `sheets` holds the names of the sheets that were converted and
+    `warnings` the number of row warnings of each kind per sheet"""
+    def __init__(self):
+        self.sheets = set()
+        self.pokemon = {}
+        self.evolve = {}
+        self.filter_data = {}
+        self.index_order = {}
+        self.variant_map = None
+        self.moves = {}
+        self.move_report = None
+        self.items = {}
+        self.abilities = {}
+        self.unknown_abilities = None
+        self.warnings = {}
+
+    @property
+    def unresolved_moves(self):
+        if not self.move_report:
+            return 0
+        return sum(len(x) for x in self.move_report["unresolved"].values())
+
+
+class Conversion:
+    """Converts sheets as they become available, in any order.
+
+    Each sheet is converted by its registered stage as soon as it is added, in its own thread, and the stages that
+    combine sheets run once their inputs are there. Stages wait for the outputs of the `expected` sheets they can use,
+    so PDATA learnsets are still resolved against the moves if MDATA is expected. By default all registered stages
+    run and every sheet they convert is expected."""
+    def __init__(self, options=None, expected=None, stages=None):
+        self.options = util.conversion_options(options)
+        self.dataset = Dataset()
+        self._lock = threading.Lock()
+        stages = registry.stages() if stages is None else stages
+        self._sheets = {stage.sheet for stage in stages if stage.sheet}
+        self._scheduler = registry.Scheduler(stages, self._sheets if expected is None else expected, self.options,
+                                             self._stage_done)
+
+    def add(self, sheet, rows):
+        if sheet not in self._sheets:
+            raise ValueError(f"Unknown sheet {sheet}")
+        self._scheduler.add(sheet, rows)
+
+    def _stage_done(self, stage, results, warnings):
+        with self._lock:
+            for name in stage.outputs:
+                setattr(self.dataset, name, results[name])
+            if stage.sheet:
+                self.dataset.sheets.add(stage.sheet)
+            self.dataset.warnings[stage.name] = warnings
+
+    def finish(self, sinks=()):
+        """Waits for all stages, runs the ones that waited on sheets that never came and writes the dataset to each
+        sink"""
+        self._scheduler.finish()
+        for sink in sinks:
+            sink.write(self.dataset)
+        return self.dataset
+
+
+def convert(sources, options=None, sinks=()):
+    """Converts the sheets in sources and writes the result to each sink.
+
+    `sources` maps sheet names ("IDATA", "MDATA", "PDATA", "TDATA" or any registered sheet) to an iterable of rows without the header row,
+    `options` updates util.DEFAULT_OPTIONS and each sink is an object with a `write(dataset)` method. Nothing is
+    shared between calls, so conversions can run concurrently."""
+    sheets = registry.sheets()
+    unknown = set(sources) - set(sheets)
+    if unknown:
+        raise ValueError(f"Unknown sheets {', '.join(sorted(unknown))}")
+    conversion = Conversion(options, expected=sources)
+    for sheet in sheets:
+        if sheet in sources:
+            conversion.add(sheet, sources[sheet])
+    return conversion.finish(sinks)
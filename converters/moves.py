@@ -1,11 +1,16 @@
 import re
-import csv
-import json
+import sys
 import logging
 try:
+    import scripts.source_data.util.parallel as parallel
+    import scripts.source_data.util.registry as registry
+    import scripts.source_data.util.reporting as reporting
     import scripts.source_data.util.util as util
     import scripts.source_data.util.remove_dice_in_description as remove_dice_in_description
 except ModuleNotFoundError:
+    from util import parallel
+    from util import registry
+    from util import reporting
     from util import util
     from util import remove_dice_in_description
 
@@ -52,9 +57,14 @@ class Move:
     RE_IS_HEALING = re.compile(r"((?:re|\b)gain.\b.*hit points)")
     RE_IS_ATTACK = re.compile("(?:melee|ranged) attack")
     RE_REQUIRE_SAVE = re.compile("(?:(?:make|with|succeed on) a (.{3}) sav)")
+    CLEANUP = {
+        "Move Power": util.CLEAN_ITEMS | util.DROP_EMPTY
+    }
 
-    def __init__(self, header):
+    def __init__(self, header, options=None):
         self.header = header
+        self.options = util.conversion_options(options)
+        self.columns = util.header_map(tuple(header))
         self.name = None
         self.healing_move = False
         self.output_data = {}
@@ -62,7 +72,7 @@ class Move:
 
     def setup_damage(self, csv_row):
         for key, level in {"Dmg lvl 1": 1, "Dmg lvl 5": 5, "Dmg lvl 10": 10, "Dmg lvl 17": 17, }.items():
-            text = csv_row[self.header.index(key)]
+            text = csv_row[self.columns[key]]
 
             damage = self.RE_DAMAGE_DICE.search(text)
             if damage:
@@ -85,7 +95,7 @@ class Move:
                 self.output_data["Damage"][str(level)] = dice
 
     def setup_extra(self, csv_row):
-        text = csv_row[self.header.index("Description")]
+        text = csv_row[self.columns["Description"]]
         saving_throw = self.RE_REQUIRE_SAVE.search(text)
         is_healing = self.RE_IS_HEALING.search(text)
         is_damage = self.RE_IS_ATTACK.search(text)
@@ -99,72 +109,78 @@ class Move:
             self.output_data["atk"] = True
 
     def setup(self, csv_row):
-        self.name = csv_row[self.header.index("Name")]
+        self.name = sys.intern(csv_row[self.columns["Name"]])
         if not self.name.strip():
             self.valid = False
             return
 
-        self.output_data["Type"] = util.ensure_string(csv_row[self.header.index("Type")])
-        self.output_data["Move Power"] = util.ensure_list(csv_row[self.header.index("Move Power")], "/")
-        self.output_data["Move Time"] = util.ensure_string(csv_row[self.header.index("Move Time")])
+        self.output_data["Type"] = util.ensure_string(csv_row[self.columns["Type"]])
+        self.output_data["Move Power"] = util.ensure_list(csv_row[self.columns["Move Power"]], "/")
+        self.output_data["Move Time"] = util.ensure_string(csv_row[self.columns["Move Time"]])
 
-        pp = csv_row[self.header.index("PP")]
+        pp = csv_row[self.columns["PP"]]
         if pp == "Unlimited":
             self.output_data["PP"] = pp
         else:
             self.output_data["PP"] = util.ensure_int(pp)
-        self.output_data["Duration"] = util.ensure_string(csv_row[self.header.index("Duration")])
-        self.output_data["Range"] = util.ensure_string(csv_row[self.header.index("Range")])
-        self.output_data["Description"] = util.ensure_string(csv_row[self.header.index("Description")])
-        self.output_data["Scaling"] = util.ensure_string(csv_row[self.header.index("scaling")])
+        self.output_data["Duration"] = util.ensure_string(csv_row[self.columns["Duration"]])
+        self.output_data["Range"] = util.ensure_string(csv_row[self.columns["Range"]])
+        self.output_data["Description"] = util.ensure_string(csv_row[self.columns["Description"]])
+        self.output_data["Scaling"] = util.ensure_string(csv_row[self.columns["scaling"]])
         self.setup_extra(csv_row)
         self.setup_damage(csv_row)
         if self.name in util.MERGE_MOVE_DATA:
             util.merge(self.output_data, util.MERGE_MOVE_DATA[self.name])
 
-        util.clean_object(self.output_data["Move Power"])
-        if not self.output_data["Move Power"]:
-            del self.output_data["Move Power"]
+        util.clean_dict(self.output_data, self.CLEANUP)
 
-        if util.options["remove_dice"]:
+        if self.options["remove_dice"]:
             remove_dice_in_description.remove_dice(self.output_data)
 
-    def search_data(self):
-        return {}
 
-    def save(self):
-        if not util.Paths.MOVES_OUTPUT.exists():
-            util.Paths.MOVES_OUTPUT.mkdir()
-        with (util.Paths.MOVES_OUTPUT / (self.name + ".json")).open("w", encoding="utf-8") as fp:
-            json.dump(util.clean_dict(self.output_data), fp, ensure_ascii=False, indent="  ", sort_keys=True)
+def _setup_moves(rows, header, options, report=None):
+    moves = []
+    for row in rows:
+        # Each row is one Move
+        move = Move(header, options)
+        move.setup(row)
+        if move.valid:
+            moves.append((move.name, move.output_data))
+        if report:
+            report.advance()
+    return moves
 
 
-def convert_mdata(input_csv, header=DEFAULT_HEADER):
-    move_list = {}
-    # Export the error move
-    with open(util.Paths.ASSETS / "extra" / "Error.json", "w", encoding="utf-8") as fp:
-        json.dump(error_move, fp, ensure_ascii=False, indent="  ", sort_keys=False)
+def _setup_moves_chunk(rows):
+    return _setup_moves(rows, parallel.state["header"], parallel.state["options"])
 
-    # convert and export all moves from the CSV
-    with open(input_csv, "r", encoding="utf-8") as fp:
-        reader = csv.reader(fp, delimiter=",", quotechar='"')
-        next(reader)
 
-        for index, row in enumerate(reader, 1):
-            if not row:
-                continue
+def convert_mdata(rows, header=DEFAULT_HEADER, options=None, report=None):
+    """Converts the MDATA rows, returns the output data of each valid move by name.
 
-            # Each row is one Pokemon
-            move = Move(header)
-            move.setup(row)
-            if move.valid:
-                move.save()
-                move_list[move.name] = move.search_data()
+    With the "jobs" option above 1 the rows are set up in that many worker processes."""
+    options = util.conversion_options(options)
+    report = report or reporting.SheetReport("MDATA")
+    rows = list(rows)
+    report.total = len(rows)
+    if options["jobs"] > 1:
+        moves = parallel.map_chunks(_setup_moves_chunk, rows, options["jobs"], report, header=header,
+                                    options=options)
+    else:
+        moves = _setup_moves(rows, header, options, report)
+    return dict(moves)
 
-    move_list["Error"] = {}
-    with open(util.Paths.OUTPUT / "move_index.json", "w", encoding="utf-8") as fp:
-        json.dump(move_list, fp, ensure_ascii=False, indent="  ", sort_keys=False)
+
+def _moves_stage(rows, inputs, options, report):
+    return {"moves": convert_mdata(rows, options=options, report=report)}
+
+
+registry.register(registry.Stage("MDATA", _moves_stage, sheet="MDATA", outputs=("moves",)))
 
 
 if __name__ == '__main__':
-    convert_mdata(util.Paths.DATA / "MDATA.csv")
+    try:
+        import scripts.source_data.api as api
+    except ModuleNotFoundError:
+        import api
+    api.convert({"MDATA": util.read_sheet(util.Paths.DATA / "MDATA.csv")}, sinks=[api.JsonSink(util.Paths.OUTPUT)])
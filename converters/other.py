@@ -1,43 +1,49 @@
-import json
-import csv
+import sys
 import logging
 try:
+    import scripts.source_data.util.registry as registry
     import scripts.source_data.util.util as util
 except ModuleNotFoundError:
+    from util import registry
     from util import util
 
 
+# The merge data of each file by its name in util, it is only loaded when first used
 MERGE_DATA = {
-    "abilities": util.MERGE_ABILITY_DATA
+    "abilities": "MERGE_ABILITY_DATA"
 }
 
 
-def __convert(_input, file_name, key):
+def __convert(rows, file_name, key, report):
     json_data = {}
-    with open(_input, "r", encoding="utf-8") as fp:
-        reader = csv.reader(fp, delimiter=",", quotechar='"')
-        next(reader)
+    merge_data = getattr(util, MERGE_DATA[file_name]) if file_name in MERGE_DATA else {}
+    for row in rows:
+        name = sys.intern(row[0])
+        json_data[name] = {key: row[1].strip()}
+        if name in merge_data:
+            util.merge(json_data[name], merge_data[name])
+        if report:
+            report.advance()
+    return json_data
 
-        for row in reader:
-            if row:
-                name = row[0]
-                json_data[name] = {key: row[1].strip()}
-                if file_name in MERGE_DATA and name in MERGE_DATA[file_name]:
-                    util.merge(json_data[name], MERGE_DATA[file_name][name])
 
-    with open(util.Paths.OUTPUT / (file_name + ".json"), "w", encoding="utf-8") as f:
-        json.dump(json_data, f, indent="  ", ensure_ascii=False, sort_keys=True)
+def convert_idata(rows, report=None):
+    return __convert(rows, "items", "Effect", report)
 
 
-def convert_idata(input_file):
-    __convert(input_file, "items", "Effect")
+def convert_tdata(rows, report=None):
+    data = __convert(rows, "abilities", "Description", report)
+    data["Power Construct"] = dict(util.MERGE_ABILITY_DATA["Power Construct"])
+    return data
 
 
-def convert_tdata(input_file):
-    __convert(input_file, "abilities", "Description")
-    with open(util.Paths.OUTPUT / "abilities.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
+def _items_stage(rows, inputs, options, report):
+    return {"items": convert_idata(rows, report)}
 
-    data["Power Construct"] = util.MERGE_ABILITY_DATA["Power Construct"]
-    with open(util.Paths.OUTPUT / "abilities.json", "w", encoding="utf-8") as fp:
-        json.dump(data, fp, indent="  ", ensure_ascii=False, sort_keys=True)
\ No newline at end of file
+
+def _abilities_stage(rows, inputs, options, report):
+    return {"abilities": convert_tdata(rows, report)}
+
+
+registry.register(registry.Stage("IDATA", _items_stage, sheet="IDATA", outputs=("items",)))
+registry.register(registry.Stage("TDATA", _abilities_stage, sheet="TDATA", outputs=("abilities",)))
@@ -1,11 +1,16 @@
 import re
-import csv
-import json
+import sys
 import logging
 
 try:
+    import scripts.source_data.util.parallel as parallel
+    import scripts.source_data.util.registry as registry
+    import scripts.source_data.util.reporting as reporting
     import scripts.source_data.util.util as util
 except ModuleNotFoundError:
+    from util import parallel
+    from util import registry
+    from util import reporting
     from util import util
 
 POKEMON = "Pokémon"
@@ -16,12 +21,16 @@ DEFAULT_HEADER = ("Index Number", "Evo Stages with Eviolite", "Evo Stages w/o Ev
                   "Climbing Speed", "Burrowing Speed", "Description 17", "Size")
 
 
+FILE_NAME_REPLACEMENTS = {" ♀": "-f", " ♂": "-m", "é": "e", "\n": " ", ":": ""}
+RE_FILE_NAME = re.compile("|".join(re.escape(x) for x in FILE_NAME_REPLACEMENTS))
+
+
 def clean_file_name(value):
-    return value.replace(" ♀", "-f").replace(" ♂", "-m").replace("é", "e").replace("\n", " ").replace(":", "")
+    return RE_FILE_NAME.sub(lambda match: FILE_NAME_REPLACEMENTS[match.group(0)], value)
 
 
 def fix_species_name(value):
-    return value.replace("\n", " ")
+    return sys.intern(value.replace("\n", " "))
 
 
 class Pokemon:
@@ -29,75 +38,87 @@ class Pokemon:
     RE_TM_MOVES = re.compile("TM: (.*)")
     RE_EGG_MOVES = re.compile("Egg Moves: (.*)")
     RE_LEVEL_MOVES = re.compile("Level (\d+): ([A-Za-z ,'-’]*)")
+    CLEANUP = {
+        "Abilities": util.CLEAN_ITEMS,
+        "Skill": util.CLEAN_ITEMS | util.DROP_EMPTY,
+        "saving_throws": util.CLEAN_ITEMS | util.DROP_EMPTY,
+        "Moves": {
+            "TM": util.DROP_EMPTY,
+            "Level": {level: util.DROP_EMPTY for level in ["2", "6", "10", "14", "18"]}
+        }
+    }
 
     def __init__(self, header):
         self.header = header
+        self.columns = util.header_map(tuple(header))
         self.name = None
         self.output_data = {}
         self.valid = True
+        # (kind, example) of everything odd in the row, counted by the sheet report
+        self.warnings = []
 
     def setup_basic_stats(self, csv_row):
-        self.output_data["index"] = util.ensure_int(csv_row[self.header.index("Index Number")])
-        self.output_data["SR"] = util.ensure_float(csv_row[self.header.index("SR")])
-        self.output_data["Hit Dice"] = util.ensure_int(csv_row[self.header.index("Hit Dice")])
-        self.output_data["MIN LVL FD"] = util.ensure_int(csv_row[self.header.index("MIN LVL FD")])
-        self.output_data["HP"] = util.ensure_int(csv_row[self.header.index("HP")])
-        self.output_data["AC"] = util.ensure_int(csv_row[self.header.index("AC")])
-        self.output_data["Evolve"] = util.ensure_string(csv_row[self.header.index("Evolve")])
+        self.output_data["index"] = util.ensure_int(csv_row[self.columns["Index Number"]])
+        self.output_data["SR"] = util.ensure_float(csv_row[self.columns["SR"]])
+        self.output_data["Hit Dice"] = util.ensure_int(csv_row[self.columns["Hit Dice"]])
+        self.output_data["MIN LVL FD"] = util.ensure_int(csv_row[self.columns["MIN LVL FD"]])
+        self.output_data["HP"] = util.ensure_int(csv_row[self.columns["HP"]])
+        self.output_data["AC"] = util.ensure_int(csv_row[self.columns["AC"]])
+        self.output_data["Evolve"] = util.ensure_string(csv_row[self.columns["Evolve"]])
 
     def setup_speed(self, csv_row):
-        self.output_data["WSp"] = util.ensure_int(csv_row[self.header.index("WSp")])
-        self.output_data["Ssp"] = util.ensure_int(csv_row[self.header.index("Ssp")])
-        self.output_data["Fsp"] = util.ensure_int(csv_row[self.header.index("Fsp")])
-        self.output_data["Climbing Speed"] = util.ensure_int(csv_row[self.header.index("Climbing Speed")])
-        self.output_data["Burrowing Speed"] = util.ensure_int(csv_row[self.header.index("Burrowing Speed")])
+        self.output_data["WSp"] = util.ensure_int(csv_row[self.columns["WSp"]])
+        self.output_data["Ssp"] = util.ensure_int(csv_row[self.columns["Ssp"]])
+        self.output_data["Fsp"] = util.ensure_int(csv_row[self.columns["Fsp"]])
+        self.output_data["Climbing Speed"] = util.ensure_int(csv_row[self.columns["Climbing Speed"]])
+        self.output_data["Burrowing Speed"] = util.ensure_int(csv_row[self.columns["Burrowing Speed"]])
 
     def setup_attributes(self, csv_row):
         self.output_data["attributes"] = {}
-        self.output_data["attributes"]["STR"] = util.ensure_int(csv_row[self.header.index("STR")])
-        self.output_data["attributes"]["DEX"] = util.ensure_int(csv_row[self.header.index("DEX")])
-        self.output_data["attributes"]["CON"] = util.ensure_int(csv_row[self.header.index("CON")])
-        self.output_data["attributes"]["INT"] = util.ensure_int(csv_row[self.header.index("INT")])
-        self.output_data["attributes"]["WIS"] = util.ensure_int(csv_row[self.header.index("WIS")])
-        self.output_data["attributes"]["CHA"] = util.ensure_int(csv_row[self.header.index("CHA")])
+        self.output_data["attributes"]["STR"] = util.ensure_int(csv_row[self.columns["STR"]])
+        self.output_data["attributes"]["DEX"] = util.ensure_int(csv_row[self.columns["DEX"]])
+        self.output_data["attributes"]["CON"] = util.ensure_int(csv_row[self.columns["CON"]])
+        self.output_data["attributes"]["INT"] = util.ensure_int(csv_row[self.columns["INT"]])
+        self.output_data["attributes"]["WIS"] = util.ensure_int(csv_row[self.columns["WIS"]])
+        self.output_data["attributes"]["CHA"] = util.ensure_int(csv_row[self.columns["CHA"]])
 
     def setup_abilities(self, csv_row):
         self.output_data["Abilities"] = []
-        self.output_data["Abilities"].append(csv_row[self.header.index("Ability1")])
-        self.output_data["Abilities"].append(csv_row[self.header.index("Ability2")])
-        self.output_data["Hidden Ability"] = util.ensure_string(csv_row[self.header.index("HiddenAbility")])
+        self.output_data["Abilities"].append(csv_row[self.columns["Ability1"]])
+        self.output_data["Abilities"].append(csv_row[self.columns["Ability2"]])
+        self.output_data["Hidden Ability"] = util.ensure_string(csv_row[self.columns["HiddenAbility"]])
 
     def setup_senses(self, csv_row):
-        self.output_data["Senses"] = util.ensure_list(csv_row[self.header.index("Senses")])
+        self.output_data["Senses"] = util.ensure_list(csv_row[self.columns["Senses"]])
 
     def setup_type(self, csv_row):
-        self.output_data["Type"] = util.ensure_list(csv_row[self.header.index("Type")], "/")
+        self.output_data["Type"] = util.ensure_list(csv_row[self.columns["Type"]], "/")
 
     def setup_skill(self, csv_row):
-        self.output_data["Skill"] = util.ensure_list(csv_row[self.header.index("Skill")])
+        self.output_data["Skill"] = util.ensure_list(csv_row[self.columns["Skill"]])
 
     def setup_size(self, csv_row):
-        self.output_data["size"] = util.ensure_string(csv_row[self.header.index("Size")])
+        self.output_data["size"] = util.ensure_string(csv_row[self.columns["Size"]])
 
     def setup_saving_throws(self, csv_row):
         self.output_data["saving_throws"] = []
-        first_saving_throw = csv_row[self.header.index("ST1")]
+        first_saving_throw = csv_row[self.columns["ST1"]]
         if "All" in first_saving_throw:
-            self.output_data["saving_throws"] = util.ATTRIBUTES
+            self.output_data["saving_throws"] = list(util.ATTRIBUTES)
         else:
             self.output_data["saving_throws"].append(first_saving_throw)
-            self.output_data["saving_throws"].append(csv_row[self.header.index("ST2")])
-            self.output_data["saving_throws"].append(csv_row[self.header.index("ST3")])
+            self.output_data["saving_throws"].append(csv_row[self.columns["ST2"]])
+            self.output_data["saving_throws"].append(csv_row[self.columns["ST3"]])
         for st in self.output_data["saving_throws"]:
             if st != "" and not (st in util.ATTRIBUTES_FULL or st in util.ATTRIBUTES):
-                print(f"ValueError: Trying to add {st} to saving throw for {self.name}")
+                self.warnings.append(("invalid saving throw", f"{st} for {self.name}"))
 
     def setup_moves(self, csv_row):
         self.output_data["Moves"] = {}
         self.output_data["Moves"]["Level"] = {}
         self.output_data["Moves"]["Starting Moves"] = []
         self.output_data["Moves"]["TM"] = []
-        move_text = csv_row[self.header.index("Moves")]
+        move_text = csv_row[self.columns["Moves"]]
         starting_moves = self.RE_STARTING_MOVES.match(move_text)
         if starting_moves:
             self.output_data["Moves"]["Starting Moves"] = util.ensure_list(starting_moves.group(1))
@@ -118,25 +139,17 @@ class Pokemon:
             self.output_data["Moves"]["egg"] = [x.strip() for x in egg_moves.group(1).split(",") if x.strip()]
 
     def cleanup(self):
-        util.clean_object(self.output_data["Abilities"])
-
-        util.clean_object(self.output_data["Skill"])
-        if not self.output_data["Skill"]:
-            del self.output_data["Skill"]
-
-        util.clean_object(self.output_data["saving_throws"])
-        if not self.output_data["saving_throws"]:
-            del self.output_data["saving_throws"]
-
-        if not self.output_data["Moves"]["TM"]:
-            del self.output_data["Moves"]["TM"]
-
-        for level in ["2", "6", "10", "14", "18"]:
-            if level in self.output_data["Moves"]["Level"] and not self.output_data["Moves"]["Level"][level]:
-                del self.output_data["Moves"]["Level"][level]
+        util.clean_dict(self.output_data, self.CLEANUP)
 
     def setup(self, csv_row):
-        self.name = fix_species_name(csv_row[self.header.index(POKEMON)])
+        self.setup_fields(csv_row)
+        if self.name in util.MERGE_POKEMON_DATA:
+            util.merge(self.output_data, util.MERGE_POKEMON_DATA[self.name])
+        self.cleanup()
+
+    def setup_fields(self, csv_row):
+        """The output data of the row, before the merge data is merged and it is cleaned up"""
+        self.name = fix_species_name(csv_row[self.columns[POKEMON]])
 
         self.setup_abilities(csv_row)
         self.setup_attributes(csv_row)
@@ -149,10 +162,6 @@ class Pokemon:
         self.setup_type(csv_row)
         self.setup_size(csv_row)
 
-        if self.name in util.MERGE_POKEMON_DATA:
-            util.merge(self.output_data, util.MERGE_POKEMON_DATA[self.name])
-        self.cleanup()
-
     def add_default_variant(self, variant_name, species_display, original_species, create_mode, permanent):
         if hasattr(self, "variant_data"):
             raise Exception("Cannot add more than 1 default variant")
@@ -174,15 +183,10 @@ class Pokemon:
         if other_poke_data:
             self.variant_data["variants"][variant_name]["diff"] = util.diff_dict(self.output_data, other_poke_data.output_data)
 
-    def save(self):
-        name = clean_file_name(self.name)
-        if not util.Paths.POKEMON_OUTPUT.exists():
-            util.Paths.POKEMON_OUTPUT.mkdir()
-        with (util.Paths.POKEMON_OUTPUT / (name + ".json")).open("w", encoding="utf-8") as fp:
-            final_output_data = self.output_data
-            if hasattr(self, "variant_data"):
-                final_output_data["variant_data"] = self.variant_data
-            json.dump(util.clean_dict(final_output_data), fp, ensure_ascii=False, indent="  ", sort_keys=True)
+    def final_output_data(self):
+        if hasattr(self, "variant_data"):
+            self.output_data["variant_data"] = self.variant_data
+        return self.output_data
 
 
 class Evolve:
@@ -193,22 +197,40 @@ class Evolve:
 
     def __init__(self, header, pokemon_by_name):
         self.header = header
+        self.columns = util.header_map(tuple(header))
         self.pokemon_by_name = pokemon_by_name
         self.output_data = {}
 
+        # Positions of the valid Pokemon by name, so the description only has to be searched for names it can contain
+        self.positions_by_name = {}
+        for position, poke in enumerate(pokemon_by_name.values()):
+            if poke.valid:
+                self.positions_by_name.setdefault(poke.name, []).append(position)
+        self.max_name_length = max((len(x) for x in self.positions_by_name), default=0)
+
+    def find_pokemon(self, text, species):
+        """Names of the valid Pokemon, other than species, surrounded by spaces in text, in Pokemon order"""
+        spaces = [index for index, char in enumerate(text) if char == " "]
+        found = set()
+        for start_index, start in enumerate(spaces):
+            for end in spaces[start_index + 1:]:
+                if end - start - 1 > self.max_name_length:
+                    break
+                name = text[start + 1:end]
+                if name != species and name in self.positions_by_name:
+                    found.add(name)
+        positions = sorted((position, name) for name in found for position in self.positions_by_name[name])
+        return [name for _, name in positions]
+
     def add(self, csv_row, poke_data):
         species = poke_data.name
 
-        self.output_data[species] = {}
-        self.output_data[species]["into"] = []
-        self.output_data[species]["current_stage"] = util.ensure_int(csv_row[self.header.index("Evo Stages with Eviolite")])
-        self.output_data[species]["total_stages"] = util.ensure_int(csv_row[self.header.index("Evo Stages w/o Eviolite")])
-        evolve_text = csv_row[self.header.index("Evolution for sheet")]
+        evolve_text = csv_row[self.columns["Evolution for sheet"]]
 
-        # Iterate all Pokemon names and see if they are in the description
-        for _, poke in self.pokemon_by_name.items():
-            if poke.valid and not poke.name == species and " {} ".format(poke.name) in evolve_text:
-                self.output_data[species]["into"].append(poke.name)
+        self.output_data[species] = {}
+        self.output_data[species]["into"] = self.find_pokemon(evolve_text, species)
+        self.output_data[species]["current_stage"] = util.ensure_int(csv_row[self.columns["Evo Stages with Eviolite"]])
+        self.output_data[species]["total_stages"] = util.ensure_int(csv_row[self.columns["Evo Stages w/o Eviolite"]])
 
         match = self.RE_POINTS.search(evolve_text)
         if match:
@@ -239,51 +261,41 @@ class Evolve:
         if species in util.MERGE_EVOLVE_DATA:
             util.merge(self.output_data[species], util.MERGE_EVOLVE_DATA[species])
 
-    def save(self):
-        with (util.Paths.OUTPUT / "evolve.json").open("w", encoding="utf-8") as fp:
-            json.dump(self.output_data, fp, ensure_ascii=False, indent="  ")
-
 
 class IndexOrder:
     def __init__(self, header):
         self.header = header
+        self.columns = util.header_map(tuple(header))
         self.output_data = {}
 
     def add(self, csv_row, poke_data):
-        value = util.ensure_int(csv_row[self.header.index("Index Number")])
+        value = util.ensure_int(csv_row[self.columns["Index Number"]])
         species = poke_data.name
 
         if value not in self.output_data:
             self.output_data[value] = []
         self.output_data[value].append(species)
 
-    def save(self):
-        with (util.Paths.OUTPUT / "index_order.json").open("w", encoding="utf-8") as fp:
-            json.dump(self.output_data, fp, ensure_ascii=False, indent="  ")
-
 
 class FilterData:
     def __init__(self, header):
         self.header = header
+        self.columns = util.header_map(tuple(header))
         self.output_data = {}
 
     def add(self, csv_row, poke_data):
         species = poke_data.name
         if species not in self.output_data:
             self.output_data[species] = {}
-        self.output_data[species]["index"] = util.ensure_int(csv_row[self.header.index("Index Number")])
+        self.output_data[species]["index"] = util.ensure_int(csv_row[self.columns["Index Number"]])
 
-        self.output_data[species]["Type"] = util.ensure_list(csv_row[self.header.index("Type")], "/")
-        self.output_data[species]["SR"] = util.ensure_float(csv_row[self.header.index("SR")])
-        self.output_data[species]["MIN LVL FD"] = util.ensure_int(csv_row[self.header.index("MIN LVL FD")])
+        self.output_data[species]["Type"] = util.ensure_list(csv_row[self.columns["Type"]], "/")
+        self.output_data[species]["SR"] = util.ensure_float(csv_row[self.columns["SR"]])
+        self.output_data[species]["MIN LVL FD"] = util.ensure_int(csv_row[self.columns["MIN LVL FD"]])
 
         if species in util.MERGE_FILTER_DATA:
             util.merge(self.output_data[species], util.MERGE_FILTER_DATA[species])
 
-    def save(self):
-        with (util.Paths.OUTPUT / "filter_data.json").open("w", encoding="utf-8") as fp:
-            json.dump(self.output_data, fp, ensure_ascii=False, indent="  ")
-
 
 class VariantMap:
     def __init__(self):
@@ -295,11 +307,6 @@ class VariantMap:
         else:
             self.output_data[poke_base_name].append(poke_variant_name)
 
-    def save(self):
-        with (util.Paths.OUTPUT / "variant_map.json").open("w", encoding="utf-8") as fp:
-            json.dump(self.output_data, fp, ensure_ascii=False, indent="  ")
-
-
 
 def collect_variant_data(poke_by_name):
     variant_map = VariantMap()
@@ -309,14 +316,8 @@ def collect_variant_data(poke_by_name):
     default_species_by_variant = {}
     # TODO: In the future we may have other variants, like Alolan forms or something.
     # It's unclear what those might look like from a data perspective
+    # The variant data is validated when the merge data is loaded, see merge_data.validate_variants
     for name, variant_poke_data in util.VARIANT_DATA.items():
-        if not "create_mode" in variant_poke_data or not isinstance(variant_poke_data["create_mode"], str):
-            raise Exception(f"Variant for species {name} does not specify 'create_mode' string")
-        if not "permanent" in variant_poke_data or not isinstance(variant_poke_data["permanent"], bool):
-            raise Exception(f"Variant for species {name} does not specify 'permanent' bool")
-        if not "variants" in variant_poke_data or not isinstance(variant_poke_data["variants"], list):
-            raise Exception(f"Variant for species {name} does not specify 'variants' list")
-
         for this_variant_data in variant_poke_data["variants"]:
             if this_variant_data["name"] in poke_by_name:
 
@@ -356,47 +357,135 @@ def collect_variant_data(poke_by_name):
     return variant_map
 
 
-def convert_pdata(input_csv, header=DEFAULT_HEADER):
-    with open(input_csv, "r", encoding="utf-8") as fp:
-        reader = csv.reader(fp, delimiter=",", quotechar='"')
-        next(reader)
-        
-        poke_by_name = {}
-        row_by_poke = {}
-
-        # Collect all the rows into Pokemon types
-        for index, row in enumerate(reader, 1):
-            if not row:
-                continue
-
-            # Each row is one Pokemon
-            poke = Pokemon(header)
-            poke.setup(row)
-            poke_by_name[poke.name] = poke
-            row_by_poke[poke] = row
-        if util.options["variants"]:
-            # Some rows are variants of a single pokemon type. Let's go collect those
-            variant_map = collect_variant_data(poke_by_name)
-
-        evolve = Evolve(header, poke_by_name)
-        filter_data = FilterData(header)
-        index_order = IndexOrder(header)
-
-        for name, poke in poke_by_name.items():
-            if poke.valid:
-                poke.save()
-                
-                row = row_by_poke[poke]
-                evolve.add(row, poke)
-                filter_data.add(row, poke)
-                index_order.add(row, poke)
+def _setup_pokemon(rows, header, report=None):
+    pokemon = []
+    for row in rows:
+        # Each row is one Pokemon
+        poke = Pokemon(header)
+        poke.setup(row)
+        pokemon.append(poke)
+        if report:
+            report.advance()
+    return pokemon
+
+
+def _setup_pokemon_chunk(rows):
+    # Only what the main process needs goes back, not the whole Pokemon
+    return [(poke.name, poke.output_data, poke.warnings) for poke in _setup_pokemon(rows, parallel.state["header"])]
+
+
+def _restore_pokemon(header, name, output_data, warnings):
+    poke = Pokemon(header)
+    poke.name = name
+    poke.output_data = output_data
+    poke.warnings = warnings
+    return poke
+
+
+def setup_pdata(rows, header=DEFAULT_HEADER, options=None, report=None):
+    """Sets up a Pokemon for each PDATA row on its own, returns (row, Pokemon) pairs in row order.
+
+    With the "jobs" option above 1 the rows are set up in that many worker processes. Progress and row warnings go
+    to `report`, a reporting.SheetReport that is finished by the caller."""
+    options = util.conversion_options(options)
+    report = report or reporting.SheetReport("PDATA")
+
+    # Collect all the rows into Pokemon types
+    rows = list(rows)
+    report.total = len(rows)
+    if options["jobs"] > 1:
+        all_pokemon = [_restore_pokemon(header, *x) for x in
+                       parallel.map_chunks(_setup_pokemon_chunk, rows, options["jobs"], report, header=header)]
+    else:
+        all_pokemon = _setup_pokemon(rows, header, report)
+
+    for poke in all_pokemon:
+        report.add_warnings(poke.warnings)
+    return list(zip(rows, all_pokemon))
+
+
+def combine_pdata(pokemon_rows, header=DEFAULT_HEADER, options=None, move_index=None):
+    """Everything that depends on other rows or sheets, returns the output data of each valid Pokemon by name and the
+    cross Pokemon data. The learnsets are resolved against move_index first, if there is one"""
+    options = util.conversion_options(options)
+    poke_by_name = {}
+    row_by_poke = {}
+    pokemon = {}
+
+    for row, poke in pokemon_rows:
+        if move_index:
+            move_index.resolve_pokemon(poke.name, poke.output_data)
+        poke_by_name[poke.name] = poke
+        row_by_poke[poke] = row
+
+    variant_map = None
+    if options["variants"]:
+        # Some rows are variants of a single pokemon type. Let's go collect those
+        variant_map = collect_variant_data(poke_by_name)
+
+    evolve = Evolve(header, poke_by_name)
+    filter_data = FilterData(header)
+    index_order = IndexOrder(header)
+
+    for name, poke in poke_by_name.items():
+        if poke.valid:
+            pokemon[poke.name] = poke.final_output_data()
+
+            row = row_by_poke[poke]
+            evolve.add(row, poke)
+            filter_data.add(row, poke)
+            index_order.add(row, poke)
+
+    return {
+        "pokemon": pokemon,
+        "evolve": evolve.output_data,
+        "filter_data": filter_data.output_data,
+        "index_order": index_order.output_data,
+        "variant_map": variant_map.output_data if variant_map else None,
+        "move_report": move_index.report if move_index else None
+    }
+
+
+def convert_pdata(rows, header=DEFAULT_HEADER, options=None, move_index=None, report=None):
+    """Converts the PDATA rows, see setup_pdata and combine_pdata"""
+    return combine_pdata(setup_pdata(rows, header, options, report), header, options, move_index)
+
+
+def check_abilities(pokemon, abilities, report):
+    """Abilities of the Pokemon that aren't in the abilities, by species"""
+    known = {util.ensure_string(x) for x in abilities}
+    unknown = {}
+    for species, data in pokemon.items():
+        for ability in data.get("Abilities", []) + [data.get("Hidden Ability")]:
+            if ability and util.ensure_string(ability) not in known:
+                unknown.setdefault(species, []).append(ability)
+                report.warn("unknown ability", f"{ability} for {species}")
+    return unknown
+
+
+def _setup_stage(rows, inputs, options, report):
+    return {"pokemon_rows": setup_pdata(rows, options=options, report=report)}
+
+
+def _combine_stage(rows, inputs, options, report):
+    return combine_pdata(inputs["pokemon_rows"], options=options, move_index=inputs["move_index"])
+
+
+def _abilities_stage(rows, inputs, options, report):
+    return {"unknown_abilities": check_abilities(inputs["pokemon"], inputs["abilities"], report)}
+
 
-        if util.options["variants"]:
-            variant_map.save()
-        evolve.save()
-        filter_data.save()
-        index_order.save()
+registry.register(registry.Stage("PDATA", _setup_stage, sheet="PDATA", provides=("pokemon_rows",)))
+registry.register(registry.Stage("pokemon", _combine_stage, inputs=("pokemon_rows",), optional_inputs=("move_index",),
+                                 outputs=("pokemon", "evolve", "filter_data", "index_order", "variant_map",
+                                          "move_report")))
+registry.register(registry.Stage("pokemon_abilities", _abilities_stage, inputs=("pokemon", "abilities"),
+                                 outputs=("unknown_abilities",)))
 
 
 if __name__ == '__main__':
-    convert_pdata(util.Paths.DATA / "PDATA.csv")
+    try:
+        import scripts.source_data.api as api
+    except ModuleNotFoundError:
+        import api
+    api.convert({"PDATA": util.read_sheet(util.Paths.DATA / "PDATA.csv")}, sinks=[api.JsonSink(util.Paths.OUTPUT)])
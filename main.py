@@ -1,54 +1,105 @@
 from pathlib import Path
 import sys
+import json
 import logging
 import argparse
 
 from gspread.exceptions import SpreadsheetNotFound
 
 try:
-    import scripts.source_data.converters.other as other
+    import scripts.source_data.api as api
     import scripts.source_data.converters.moves as moves
-    import scripts.source_data.converters.pokemon as pokemon
+    import scripts.source_data.util.build_diff as build_diff
     import scripts.source_data.util.fetch_data as fetch
+    import scripts.source_data.util.golden as golden
+    import scripts.source_data.util.merge_data as merge_data
+    import scripts.source_data.util.registry as registry
+    import scripts.source_data.util.reporting as reporting
     import scripts.source_data.util.util as util
 except ModuleNotFoundError:
-    import converters.other as other
+    import api
     import converters.moves as moves
-    import converters.pokemon as pokemon
+    import util.build_diff as build_diff
     import util.fetch_data as fetch
+    import util.golden as golden
+    import util.merge_data as merge_data
+    import util.registry as registry
+    import util.reporting as reporting
     import util.util as util
 
-data_sheets = {
-    "IDATA.csv": other.convert_idata,    # Items
-    "MDATA.csv": moves.convert_mdata,    # Moves
-    "PDATA.csv": pokemon.convert_pdata,  # Pokemon
-    "TDATA.csv": other.convert_tdata     # Abilities
-}
 
-
-def convert_all(folder):
+def convert_all(folder, options=None, sinks=None, strict_moves=False):
     folder = Path(folder)
     if not folder.exists():
         logging.error(f"Could not find data folder, aborting")
         sys.exit(1)
-    if not util.Paths.OUTPUT.exists():
-        util.Paths.OUTPUT.mkdir()
-        util.Paths.MOVES_OUTPUT.mkdir()
-        util.Paths.POKEMON_OUTPUT.mkdir()
-
-    for file_path in folder.iterdir():
-        if file_path.name in data_sheets:
-            logging.debug(f"Starting converting {file_path.stem}")
-            data_sheets[file_path.name](file_path)
-            logging.debug(f"Finished converting {file_path.stem}")
+    if sinks is None:
+        sinks = [api.JsonSink(util.Paths.OUTPUT, util.conversion_options(options)["jobs"])]
+
+    sources = {}
+    for sheet in registry.sheets():
+        file_path = folder / (sheet + ".csv")
+        if file_path.exists():
+            sources[sheet] = util.read_sheet(file_path)
+    return _write(api.convert(sources, options), sinks, strict_moves)
+
+
+def convert_stream(file_or_secret, options=None, sinks=None, strict_moves=False, archive=True):
+    """Converts each worksheet as soon as it has been downloaded instead of after all of them"""
+    if sinks is None:
+        sinks = [api.JsonSink(util.Paths.OUTPUT, util.conversion_options(options)["jobs"])]
+
+    logging.info("Starting downloading spreadsheets")
+    conversion = api.Conversion(options)
+    for title, rows in fetch.stream(fetch.get_worksheet(file_or_secret).worksheets(), archive, registry.sheets()):
+        logging.debug(f"Downloaded {title}")
+        conversion.add(title, util.sheet_rows(rows))
+    logging.info("Finished downloading spreadsheets")
+    return _write(conversion.finish(), sinks, strict_moves)
+
+
+def _write(dataset, sinks, strict_moves):
+    if dataset.unresolved_moves:
+        logging.warning(f"{dataset.unresolved_moves} learnset moves could not be found among the moves, "
+                        f"see move_report.json")
+        if strict_moves:
+            logging.error("Unresolved learnset moves, aborting")
+            sys.exit(1)
+
+    if "MDATA" in dataset.sheets:
+        # Export the error move, only the command line does this as it writes into assets
+        with (util.Paths.ASSETS / "extra" / "Error.json").open("w", encoding="utf-8") as fp:
+            json.dump(moves.error_move, fp, ensure_ascii=False, indent="  ", sort_keys=False)
+    for sink in sinks:
+        sink.write(dataset)
+    return dataset
+
+
+def _log_options():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--log-level', dest="log_level", default="INFO",
+                        choices=("DEBUG", "INFO", "WARNING", "ERROR"), help="Only log messages of this level and up")
+    parser.add_argument('--log-json', dest="log_json", action='store_true',
+                        help="Log one JSON object per line, for CI")
+    return parser
 
 
 def _cli_options():
-    parser = argparse.ArgumentParser()
+    parser = argparse.ArgumentParser(parents=[_log_options()])
     optional = parser._action_groups.pop()
     optional.add_argument('-k', '--keep-dice', action='store_true', dest="keep_dice")
     optional.add_argument('-o', '--output', dest="output", help="Custom output directory")
     optional.add_argument('-nv', '--no-variants', dest="no_variants", action='store_true', help="Custom output directory")
+    optional.add_argument('-j', '--jobs', dest="jobs", type=int, default=1,
+                          help="Number of processes used to convert the Pokemon and move rows")
+    optional.add_argument('--no-archive', dest="no_archive", action='store_true',
+                          help="Don't save the downloaded sheets to the data folder")
+    optional.add_argument('--strict-moves', dest="strict_moves", action='store_true',
+                          help="Fail if a learnset references a move that doesn't exist")
+    optional.add_argument('--level-tables', dest="level_tables", action='store_true',
+                          help="Also output per level damage and HP tables")
+    optional.add_argument('--sqlite', dest="sqlite", help="Also export the converted data to this SQLite file")
+    optional.add_argument('--bundle', dest="bundle", help="Also pack the converted data into this bundle file")
 
     required = parser.add_argument_group("required arguments")
     required.add_argument('token', nargs="?",
@@ -62,36 +113,113 @@ def _cli_options():
 def _run_cli():
     parser = _cli_options()
     options = parser.parse_args()
-    util.update_options({
+    conversion_options = {
         "remove_dice": not options.keep_dice,
-        "output": options.output if options.output else False,
-        "variants": not options.no_variants
-    })
+        "variants": not options.no_variants,
+        "jobs": options.jobs
+    }
+    output = Path(options.output) if options.output else util.Paths.OUTPUT
+    sinks = [api.JsonSink(output, options.jobs)]
+    if options.level_tables:
+        sinks.append(api.LevelTablesSink(output))
+    if options.sqlite:
+        sinks.append(api.SqliteSink(options.sqlite))
+    if options.bundle:
+        sinks.append(api.BundleSink(options.bundle))
 
     if not options.token:
         if (Path(__file__).parent / "data").exists:
-            convert_all(Path(__file__).parent / "data")
+            convert_all(Path(__file__).parent / "data", conversion_options, sinks, options.strict_moves)
         else:
             logging.warning("Please provide either a access file or a folder with the Download DATA sheets in")
     else:
         argument = options.token
         if Path(options.token).is_dir():
-            convert_all(argument)
+            convert_all(argument, conversion_options, sinks, options.strict_moves)
         else:
             try:
-                _folder = fetch.main(file_or_secret=argument)
+                convert_stream(argument, conversion_options, sinks, options.strict_moves, not options.no_archive)
             except SpreadsheetNotFound:
                 logging.error("SpreadsheetNotFound: Could not find the spreadsheet on the service account")
                 sys.exit(1)
-            convert_all(_folder)
-
 
 
     logging.info("Conversion finished")
 
 
+def _run_diff(arguments):
+    parser = argparse.ArgumentParser(prog="main.py diff", description="Compare two builds record by record",
+                                     parents=[_log_options()])
+    parser.add_argument('old', help="Output directory or bundle file of the old build")
+    parser.add_argument('new', help="Output directory or bundle file of the new build")
+    parser.add_argument('--output', dest="output", help="Write the report to this file instead of stdout")
+    options = parser.parse_args(arguments)
+
+    try:
+        report = build_diff.diff(options.old, options.new)
+    except (ValueError, OSError) as e:
+        logging.error(e)
+        sys.exit(1)
+
+    for section, section_diff in report.items():
+        logging.info(f"{section}: {len(section_diff['added'])} added, {len(section_diff['removed'])} removed, "
+                     f"{len(section_diff['changed'])} changed")
+    if options.output:
+        with Path(options.output).open("w", encoding="utf-8") as fp:
+            json.dump(report, fp, ensure_ascii=False, indent="  ")
+    else:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent="  ")
+        sys.stdout.write("\n")
+    if not report:
+        logging.info("The builds are identical")
+
+
+def _run_golden(arguments):
+    parser = argparse.ArgumentParser(prog="main.py golden",
+                                     description="Check the output on the fixture sheets and time the hot functions",
+                                     parents=[_log_options()])
+    parser.add_argument('command', choices=("check", "update", "bench"),
+                        help="check: compare with the golden output, update: replace the golden output, "
+                             "bench: run the benchmarks")
+    parser.add_argument('--save', dest="save", action='store_true', help="Add the benchmark results to the history")
+    parser.add_argument('--only', dest="only", action='append', choices=list(golden.BENCHMARKS),
+                        help="Only run this benchmark, can be given more than once")
+    options = parser.parse_args(arguments)
+
+    if options.command == "check":
+        if not golden.check():
+            sys.exit(1)
+    elif options.command == "update":
+        golden.update()
+    else:
+        golden.benchmark(options.only, save=options.save)
+
+
+def _run_snapshot(arguments):
+    parser = argparse.ArgumentParser(prog="main.py snapshot",
+                                     description="Validate assets/extra and compile it into the merge data snapshot",
+                                     parents=[_log_options()])
+    parser.parse_args(arguments)
+    try:
+        merge_data.compile_snapshot(util.Paths.ASSETS / "extra", util.Paths.MERGE_DATA_SNAPSHOT)
+    except (merge_data.MergeDataError, ValueError) as e:
+        logging.error(e)
+        sys.exit(1)
+    logging.info(f"Saved the merge data snapshot to {util.Paths.MERGE_DATA_SNAPSHOT}")
+
+
 def main():
-    logging.getLogger().setLevel(logging.DEBUG)
+    log_options, _ = _log_options().parse_known_args()
+    reporting.configure(log_options.log_level, log_options.log_json)
+    if sys.argv[1:2] == ["diff"]:
+        _run_diff(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["golden"]:
+        _run_golden(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["snapshot"]:
+        _run_snapshot(sys.argv[2:])
+        return
     logging.info("Conversion started")
     try:
         _run_cli()
@@ -0,0 +1,89 @@
+import json
+from pathlib import Path
+from contextlib import ExitStack
+
+try:
+    import scripts.source_data.util.bundle as bundle
+    import scripts.source_data.util.util as util
+except ModuleNotFoundError:
+    from util import bundle
+    from util import util
+
+# Directories in the output with one file per record
+RECORD_DIRECTORIES = ("pokemon", "moves")
+# Files in the output that hold one record per key
+RECORD_FILES = ("evolve", "filter_data", "index_order", "variant_map", "items", "abilities", "move_index")
+
+
+class _Section:
+    """The records of one section by name, `fingerprint` returns something that is equal for equal records and
+    cheaper to compare than the decoded records"""
+    def __init__(self, names, read, fingerprint):
+        self.names = names
+        self.read = read
+        self.fingerprint = fingerprint
+
+
+def _load_directory(path):
+    sections = {}
+    for section in RECORD_DIRECTORIES:
+        if (path / section).is_dir():
+            raw = {x.stem: x.read_bytes() for x in (path / section).glob("*.json")}
+            sections[section] = _Section(raw.keys(), lambda name, raw=raw: json.loads(raw[name]), raw.get)
+    for section in RECORD_FILES:
+        file_path = (path / section).with_suffix(".json")
+        if file_path.exists():
+            with file_path.open(encoding="utf-8") as fp:
+                records = json.load(fp)
+            sections[section] = _Section(records.keys(), records.get, records.get)
+    return sections
+
+
+def _load_bundle(path, stack):
+    _bundle = stack.enter_context(bundle.Bundle(path))
+    sections = {}
+    for section in bundle.SECTIONS:
+        sections[section] = _Section(set(_bundle.names(section)),
+                                     lambda name, section=section: json.loads(_bundle.raw(section, name)),
+                                     lambda name, section=section: _bundle.record_hash(section, name))
+    return sections
+
+
+def load(path, stack):
+    """Loads a converted output directory or a bundle file, bundles stay open until stack is closed"""
+    path = Path(path)
+    if path.is_dir():
+        return _load_directory(path)
+    return _load_bundle(path, stack)
+
+
+def diff_section(old, new):
+    changed = {}
+    for name in old.names & new.names:
+        if old.fingerprint(name) == new.fingerprint(name):
+            continue
+        changes = util.diff_fields(old.read(name), new.read(name))
+        if changes:
+            changed[name] = changes
+    return {
+        "added": sorted(new.names - old.names),
+        "removed": sorted(old.names - new.names),
+        "changed": dict(sorted(changed.items()))
+    }
+
+
+def diff(old_path, new_path):
+    """Field level changes of every record between two builds, either two output directories or two bundles.
+
+    Sections that are only in one of the builds are skipped."""
+    if Path(old_path).is_dir() != Path(new_path).is_dir():
+        raise ValueError("Can only compare two output directories or two bundles")
+    with ExitStack() as stack:
+        old = load(old_path, stack)
+        new = load(new_path, stack)
+        report = {}
+        for section in sorted(old.keys() & new.keys()):
+            section_diff = diff_section(old[section], new[section])
+            if section_diff["added"] or section_diff["removed"] or section_diff["changed"]:
+                report[section] = section_diff
+    return report
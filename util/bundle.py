@@ -0,0 +1,138 @@
+import os
+import json
+import mmap
+import struct
+import hashlib
+import logging
+from pathlib import Path
+from functools import lru_cache
+
+MAGIC = b"P5EB"
+VERSION = 2
+HEADER = struct.Struct("<4sII")  # magic, version, index length
+
+# Dataset attributes that are packed, each becomes a section in the bundle
+SECTIONS = ("pokemon", "evolve", "variant_map", "moves", "abilities", "items")
+
+
+class BundleError(ValueError):
+    pass
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def write_bundle(output_file, dataset):
+    """Pack the converted dataset into a single bundle file"""
+    index = {}
+    records = []
+    offset = 0
+    for section in SECTIONS:
+        index[section] = {}
+        for name, record in (getattr(dataset, section) or {}).items():
+            blob = _dumps(record)
+            index[section][name] = (offset, len(blob), hashlib.blake2b(blob, digest_size=8).hexdigest())
+            records.append(blob)
+            offset += len(blob)
+
+    index_blob = _dumps(index)
+    # Readers may have the bundle mmapped, truncating it in place would crash them, so it is replaced as a whole
+    output_file = Path(output_file)
+    temporary_file = output_file.with_name(f".{output_file.name}.{os.getpid()}.tmp")
+    try:
+        with temporary_file.open("wb") as fp:
+            fp.write(HEADER.pack(MAGIC, VERSION, len(index_blob)))
+            fp.write(index_blob)
+            fp.writelines(records)
+        os.replace(temporary_file, output_file)
+    except BaseException:
+        if temporary_file.exists():
+            temporary_file.unlink()
+        raise
+    logging.debug(f"Wrote bundle to {output_file}")
+
+
+class Bundle:
+    """Read only view of a bundle written by `write_bundle`.
+
+    The bundle is one file: a fixed header, a JSON index with the offset, length and hash of every record and then
+    the records as JSON. The file is mmapped and records are only decoded when asked for, the last `cache_size` of them
+    are cached, so don't modify the returned records.
+
+        with Bundle("p5e.bundle") as bundle:
+            bundle.get_pokemon("Bulbasaur")
+    """
+    def __init__(self, path, cache_size=1024):
+        self.path = Path(path)
+        with self.path.open("rb") as fp:
+            try:
+                self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can't be mapped
+                raise BundleError(f"{self.path} is not a bundle")
+
+        if len(self._mmap) < HEADER.size:
+            self.close()
+            raise BundleError(f"{self.path} is not a bundle")
+        magic, version, index_length = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self.close()
+            raise BundleError(f"{self.path} is not a bundle")
+        if version != VERSION:
+            self.close()
+            raise BundleError(f"{self.path} is bundle version {version}, expected {VERSION}")
+        if HEADER.size + index_length > len(self._mmap):
+            self.close()
+            raise BundleError(f"{self.path} is truncated")
+
+        try:
+            self._index = json.loads(self._mmap[HEADER.size:HEADER.size + index_length])
+        except ValueError:
+            self.close()
+            raise BundleError(f"{self.path} has a corrupt index")
+        self._records_start = HEADER.size + index_length
+        self._record = lru_cache(maxsize=cache_size)(self._decode)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+
+    def _decode(self, section, name):
+        if name not in self._index[section]:
+            return None
+        return json.loads(self.raw(section, name))
+
+    def raw(self, section, name):
+        offset, length, _ = self._index[section][name]
+        start = self._records_start + offset
+        return self._mmap[start:start + length]
+
+    def record_hash(self, section, name):
+        return self._index[section][name][2]
+
+    def names(self, section):
+        return list(self._index[section])
+
+    def get_pokemon(self, name):
+        return self._record("pokemon", name)
+
+    def get_move(self, name):
+        return self._record("moves", name)
+
+    def get_ability(self, name):
+        return self._record("abilities", name)
+
+    def get_item(self, name):
+        return self._record("items", name)
+
+    def evolutions_of(self, name):
+        return self._record("evolve", name)
+
+    def variants_of(self, name):
+        return self._record("variant_map", name) or []
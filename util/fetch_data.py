@@ -5,13 +5,16 @@ import os
 import sys
 from pathlib import Path
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 
 try:
+    import scripts.source_data.util.reporting as reporting
     import scripts.source_data.util.util as util
 except ModuleNotFoundError:
+    from util import reporting
     from util import util
 
 
@@ -19,14 +22,17 @@ DATA_SHEETS = ["IDATA", "MDATA", "PDATA", "TDATA"]
 
 
 def save_worksheet(worksheet):
-    if not util.Paths.DATA.exists():
-        util.Paths.DATA.mkdir(parents=True)
+    save_rows(worksheet.title, worksheet.get_all_values())
 
-    output_file = Path(util.Paths.DATA) / (worksheet.title + ".csv")
+
+def save_rows(title, content):
+    # Several downloads can get here at the same time
+    util.Paths.DATA.mkdir(parents=True, exist_ok=True)
+
+    output_file = Path(util.Paths.DATA) / (title + ".csv")
 
     with open(output_file, "w", encoding="utf-8") as f:
         writer = csv.writer(f, delimiter=",", quotechar='"')
-        content = worksheet.get_all_values()
         for row in content:
             new_row = []
             for record in row:
@@ -34,7 +40,7 @@ def save_worksheet(worksheet):
             try:
                 writer.writerow(new_row)
             except (UnicodeEncodeError, UnicodeDecodeError):
-                print("Caught unicode error")
+                logging.warning(f"Skipped a row of {title} that could not be encoded")
 
 
 def get_worksheet(file_or_secret):
@@ -51,6 +57,27 @@ def get_worksheet(file_or_secret):
     return gc.open(r"DM Pokémon Builder Gen I - VII.xlsx")
 
 
+def fetch_rows(worksheet, archive=True):
+    content = worksheet.get_all_values()
+    if archive:
+        save_rows(worksheet.title, content)
+    return content
+
+
+def stream(worksheets, archive=True, sheets=DATA_SHEETS):
+    """Downloads the worksheets in `sheets` concurrently, yielding (title, rows) for each as soon as it has arrived.
+
+    Anything with a `title` and a `get_all_values()` works as a worksheet. With `archive` each worksheet is also
+    saved to the data folder, like `main` does."""
+    worksheets = [x for x in worksheets if x.title in sheets]
+    if not worksheets:
+        return
+    with ThreadPoolExecutor(max_workers=len(worksheets)) as executor:
+        futures = {executor.submit(fetch_rows, worksheet, archive): worksheet.title for worksheet in worksheets}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
 def main(file_or_secret):
     logging.info("Starting downloading spreadsheets")
     wks = get_worksheet(file_or_secret)
@@ -62,11 +89,12 @@ def main(file_or_secret):
 
 
 if __name__ == '__main__':
+    reporting.configure()
     if len(sys.argv) == 2:
         credentials_file = sys.argv[1]
         if os.path.exists(credentials_file):
             main(file_or_secret=credentials_file)
         else:
-            print("Error: Access file not found, please provide a valid path")
+            logging.error("Access file not found, please provide a valid path")
     else:
-        print("Please provide the access file")
+        logging.error("Please provide the access file")
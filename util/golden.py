@@ -0,0 +1,314 @@
+import os
+import csv
+import sys
+import json
+import time
+import shutil
+import logging
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import datetime, timezone
+
+try:
+    import scripts.source_data.api as api
+    import scripts.source_data.converters.moves as moves
+    import scripts.source_data.converters.pokemon as pokemon
+    import scripts.source_data.util.build_diff as build_diff
+    import scripts.source_data.util.fetch_data as fetch
+    import scripts.source_data.util.registry as registry
+    import scripts.source_data.util.reporting as reporting
+    import scripts.source_data.util.util as util
+except ModuleNotFoundError:
+    import api
+    import converters.moves as moves
+    import converters.pokemon as pokemon
+    import util.build_diff as build_diff
+    import util.fetch_data as fetch
+    import util.registry as registry
+    import util.reporting as reporting
+    from util import util
+
+FIXTURES = util.Paths.ASSETS / "fixtures"
+SHEETS = FIXTURES / "sheets"
+GOLDEN = FIXTURES / "golden"
+BENCHMARK_HISTORY = FIXTURES / "benchmarks.json"
+
+# Options the golden output is built with, kept apart from util.DEFAULT_OPTIONS so changing those doesn't change it
+GOLDEN_OPTIONS = {"remove_dice": True, "variants": True, "jobs": 1}
+
+
+def _fixture_sheets():
+    # Sheets registered without a fixture are left out, like missing sheets in the data folder
+    return [sheet for sheet in registry.sheets() if (SHEETS / (sheet + ".csv")).exists()]
+
+
+def read_fixtures():
+    return {sheet: list(util.read_sheet(SHEETS / (sheet + ".csv"))) for sheet in _fixture_sheets()}
+
+
+class FakeWorksheet:
+    """A fixture sheet in place of a downloaded worksheet, with the header row like the real one"""
+    def __init__(self, path):
+        self.title = path.stem
+        self.path = path
+
+    def get_all_values(self):
+        with self.path.open(encoding="utf-8", newline="") as fp:
+            return list(csv.reader(fp))
+
+
+def _sinks(output_dir):
+    output_dir = Path(output_dir)
+    return [api.JsonSink(output_dir), api.LevelTablesSink(output_dir)]
+
+
+def build(output_dir):
+    """Converts the fixture sheets into output_dir"""
+    api.convert(read_fixtures(), GOLDEN_OPTIONS, _sinks(output_dir))
+
+
+def build_stream(output_dir):
+    """Converts the fixture sheets into output_dir the way main.convert_stream converts downloaded worksheets"""
+    sheets = _fixture_sheets()
+    conversion = api.Conversion(GOLDEN_OPTIONS, expected=sheets)
+    worksheets = [FakeWorksheet(SHEETS / (sheet + ".csv")) for sheet in sheets]
+    for title, rows in fetch.stream(worksheets, archive=False, sheets=sheets):
+        conversion.add(title, util.sheet_rows(rows))
+    conversion.finish(_sinks(output_dir))
+
+
+def _files(path):
+    return {x.relative_to(path).as_posix() for x in path.rglob("*") if x.is_file()}
+
+
+def compare(golden_dir, output_dir):
+    """Relative paths of the files that are missing, extra or differ in output_dir, compared byte for byte"""
+    golden_files = _files(golden_dir)
+    output_files = _files(output_dir)
+    return {
+        "missing": sorted(golden_files - output_files),
+        "extra": sorted(output_files - golden_files),
+        "changed": sorted(x for x in golden_files & output_files
+                          if (golden_dir / x).read_bytes() != (output_dir / x).read_bytes())
+    }
+
+
+def _check(name, build_output):
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_dir = Path(output_dir)
+        build_output(output_dir)
+        result = compare(GOLDEN, output_dir)
+        if not any(result.values()):
+            logging.info(f"Output of the {name} matches the golden output")
+            return True
+
+        for kind, files in result.items():
+            for file in files:
+                logging.error(f"{name}: {kind}: {file}")
+        report = build_diff.diff(GOLDEN, output_dir)
+        json.dump(report, sys.stdout, ensure_ascii=False, indent="  ")
+        sys.stdout.write("\n")
+        return False
+
+
+def check():
+    """Converts the fixture sheets, from the folder and streamed as worksheets, and compares both results with the
+    golden output, returns True if they match"""
+    folder_matches = _check("sheet folder", build)
+    stream_matches = _check("worksheet stream", build_stream)
+    return folder_matches and stream_matches
+
+
+def update():
+    """Replaces the golden output with the output of the current code, only do this for intended changes"""
+    shutil.rmtree(GOLDEN, ignore_errors=True)
+    build(GOLDEN)
+    logging.info(f"Updated the golden output in {GOLDEN}")
+
+
+def _fixture_pokemon(pdata):
+    return {poke.name: poke for poke in pokemon._setup_pokemon(pdata, pokemon.DEFAULT_HEADER)}
+
+
+def _benchmark_collect_variant_data(pdata):
+    # collect_variant_data changes the Pokemon it is given, so every call gets a fresh set of them
+    return lambda: _fixture_pokemon(pdata), pokemon.collect_variant_data
+
+
+def _benchmark_evolve_add(pdata):
+    poke_by_name = _fixture_pokemon(pdata)
+    pokemon.collect_variant_data(poke_by_name)
+    rows = [(row, poke) for row, poke in zip(pdata, poke_by_name.values()) if poke.valid]
+
+    def run(_):
+        evolve = pokemon.Evolve(pokemon.DEFAULT_HEADER, poke_by_name)
+        for row, poke in rows:
+            evolve.add(row, poke)
+    return None, run
+
+
+def _benchmark_pokemon_setup(pdata):
+    def run(_):
+        for row in pdata:
+            pokemon.Pokemon(pokemon.DEFAULT_HEADER).setup(row)
+    return None, run
+
+
+def _benchmark_move_setup(mdata):
+    def run(_):
+        for row in mdata:
+            moves.Move(moves.DEFAULT_HEADER, GOLDEN_OPTIONS).setup(row)
+    return None, run
+
+
+def _benchmark_merge(pdata):
+    columns = pokemon.Pokemon(pokemon.DEFAULT_HEADER).columns
+    rows = [row for row in pdata if pokemon.fix_species_name(row[columns[pokemon.POKEMON]]) in util.MERGE_POKEMON_DATA]
+
+    def setup():
+        # The output data before the merge, merging already merged data would only take the shortcuts in util.merge
+        pairs = []
+        for row in rows:
+            poke = pokemon.Pokemon(pokemon.DEFAULT_HEADER)
+            poke.setup_fields(row)
+            pairs.append((poke.output_data, util.MERGE_POKEMON_DATA[poke.name]))
+        return pairs
+
+    def run(pairs):
+        for output_data, merge_data in pairs:
+            util.merge(output_data, merge_data)
+    return setup, run
+
+
+# The parallel benchmarks run on the fixture rows repeated this many times, so the work outweighs starting workers
+PARALLEL_SCALE = 50
+PARALLEL_JOBS = max(os.cpu_count() or 1, 2)
+
+
+def _benchmark_setup_pdata(pdata, jobs):
+    rows = pdata * PARALLEL_SCALE
+
+    def run(_):
+        pokemon.setup_pdata(rows, options={"jobs": jobs}, report=reporting.SheetReport("PDATA", interval=float("inf")))
+    return None, run
+
+
+def _benchmark_convert_mdata(mdata, jobs):
+    rows = mdata * PARALLEL_SCALE
+
+    def run(_):
+        moves.convert_mdata(rows, options={"jobs": jobs}, report=reporting.SheetReport("MDATA", interval=float("inf")))
+    return None, run
+
+
+def _benchmark_json_sink(sheets, jobs):
+    dataset = api.convert(sheets, GOLDEN_OPTIONS)
+    # Renamed copies of every Pokemon and move, so there are as many files as from the scaled rows
+    dataset.pokemon = {f"{name} {i}": data for i in range(PARALLEL_SCALE) for name, data in dataset.pokemon.items()}
+    dataset.moves = {f"{name} {i}": data for i in range(PARALLEL_SCALE) for name, data in dataset.moves.items()}
+
+    def run(output_dir):
+        api.JsonSink(output_dir.name, jobs).write(dataset)
+    # Every run writes into a new directory, which is removed again when the next one is made
+    return tempfile.TemporaryDirectory, run
+
+
+# Name of each benchmark and a function that takes the fixture sheets and returns a setup function, or None, and the
+# function that is timed. The result of setup is passed to the timed function and setup isn't timed
+BENCHMARKS = {
+    "Pokemon.setup": lambda sheets: _benchmark_pokemon_setup(sheets["PDATA"]),
+    "Move.setup": lambda sheets: _benchmark_move_setup(sheets["MDATA"]),
+    "Evolve.add": lambda sheets: _benchmark_evolve_add(sheets["PDATA"]),
+    "collect_variant_data": lambda sheets: _benchmark_collect_variant_data(sheets["PDATA"]),
+    "util.merge": lambda sheets: _benchmark_merge(sheets["PDATA"]),
+    "setup_pdata jobs=1": lambda sheets: _benchmark_setup_pdata(sheets["PDATA"], 1),
+    "setup_pdata jobs=cpus": lambda sheets: _benchmark_setup_pdata(sheets["PDATA"], PARALLEL_JOBS),
+    "convert_mdata jobs=1": lambda sheets: _benchmark_convert_mdata(sheets["MDATA"], 1),
+    "convert_mdata jobs=cpus": lambda sheets: _benchmark_convert_mdata(sheets["MDATA"], PARALLEL_JOBS),
+    "JsonSink jobs=1": lambda sheets: _benchmark_json_sink(sheets, 1),
+    "JsonSink jobs=cpus": lambda sheets: _benchmark_json_sink(sheets, PARALLEL_JOBS),
+}
+# Serial and parallel benchmark of the same work, the speedup between them is logged
+SPEEDUPS = (("setup_pdata jobs=1", "setup_pdata jobs=cpus"), ("convert_mdata jobs=1", "convert_mdata jobs=cpus"),
+            ("JsonSink jobs=1", "JsonSink jobs=cpus"))
+
+
+def _time(setup, run, number):
+    total = 0
+    for _ in range(number):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        run(argument)
+        total += time.perf_counter() - start
+    return total
+
+
+def _calls_per_run(setup, run, minimum=0.2):
+    # Counts the setup time as well, so a slow setup doesn't multiply the number of calls
+    number = 1
+    while True:
+        start = time.perf_counter()
+        _time(setup, run, number)
+        if time.perf_counter() - start >= minimum:
+            return number
+        number *= 2
+
+
+def _revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=util.Paths.ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _load_history():
+    if not BENCHMARK_HISTORY.exists():
+        return []
+    with BENCHMARK_HISTORY.open(encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def benchmark(names=None, repeat=5, save=False):
+    """Times each benchmark on the fixture sheets and compares it with the last stored run.
+
+    Each benchmark runs over all fixture rows, the best of `repeat` runs is kept. With save the results are added
+    to the benchmark history."""
+    sheets = read_fixtures()
+    history = _load_history()
+    previous = history[-1]["results"] if history else {}
+
+    results = {}
+    for name, make in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        setup, run = make(sheets)
+        number = _calls_per_run(setup, run)
+        timings = [_time(setup, run, number) for _ in range(repeat)]
+        results[name] = {"best": min(timings) / number, "mean": sum(timings) / len(timings) / number}
+
+        change = ""
+        if name in previous:
+            change = f" ({results[name]['best'] / previous[name]['best'] - 1:+.1%} against the last run)"
+        logging.info(f"{name}: {results[name]['best'] * 1000:.3f} ms{change}")
+
+    for serial, parallel in SPEEDUPS:
+        if serial in results and parallel in results:
+            logging.info(f"{parallel}: {results[serial]['best'] / results[parallel]['best']:.2f}x the speed of "
+                         f"{serial} with {PARALLEL_JOBS} jobs on {os.cpu_count()} CPUs")
+
+    if save:
+        history.append({
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": _revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "results": results
+        })
+        with BENCHMARK_HISTORY.open("w", encoding="utf-8") as fp:
+            json.dump(history, fp, indent="  ")
+        logging.info(f"Saved the results to {BENCHMARK_HISTORY}")
+    return results
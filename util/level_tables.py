@@ -0,0 +1,89 @@
+import json
+import logging
+
+try:
+    import scripts.source_data.util.util as util
+except ModuleNotFoundError:
+    from util import util
+
+LEVELS = range(1, 21)
+DAMAGE_FIELDS = ("amount", "dice_max", "times", "modifier", "flags")
+FLAG_MOVE = 1   # Add the move power modifier
+FLAG_LEVEL = 2  # Add the level
+
+
+def proficiency_bonus(level):
+    return 2 + (level - 1) // 4
+
+
+def ability_modifier(score):
+    return (score - 10) // 2
+
+
+def _pack_damage(dice):
+    flags = (FLAG_MOVE if dice.get("move") else 0) | (FLAG_LEVEL if dice.get("level") else 0)
+    return dice["amount"], dice["dice_max"], dice.get("times", 1), dice.get("modifier", 0), flags
+
+
+def move_table(move):
+    """Damage for every level as a list of distinct packed damage expressions plus, per level, the index of the
+    expression that applies (-1 before the first breakpoint)"""
+    damage = move.get("Damage")
+    if not damage:
+        return None
+    breakpoints = sorted((int(level), _pack_damage(dice)) for level, dice in damage.items())
+
+    expressions = []
+    by_level = []
+    current = -1
+    next_breakpoint = 0
+    for level in LEVELS:
+        while next_breakpoint < len(breakpoints) and breakpoints[next_breakpoint][0] <= level:
+            packed = breakpoints[next_breakpoint][1]
+            if not expressions or expressions[-1] != packed:
+                expressions.append(packed)
+            current = len(expressions) - 1
+            next_breakpoint += 1
+        by_level.append(current)
+    return {"damage": [x for packed in expressions for x in packed], "by_level": by_level}
+
+
+def pokemon_table(pokemon):
+    """Average max HP for every level, 0 below the minimum level the Pokemon can be found at"""
+    hit_dice = pokemon.get("Hit Dice")
+    hp = pokemon.get("HP")
+    con = pokemon.get("attributes", {}).get("CON")
+    if hit_dice is None or hp is None or con is None:
+        return None
+    min_level = pokemon.get("MIN LVL FD") or 1
+    per_level = max(hit_dice // 2 + 1 + ability_modifier(con), 1)
+    return {
+        "hp": [hp + (level - min_level) * per_level if level >= min_level else 0 for level in LEVELS],
+        "modifiers": [ability_modifier(pokemon["attributes"].get(x) or 10) for x in util.ATTRIBUTES]
+    }
+
+
+def build(dataset):
+    tables = {
+        "levels": [LEVELS.start, LEVELS.stop - 1],
+        "damage_fields": DAMAGE_FIELDS,
+        "modifier_order": util.ATTRIBUTES,
+        "proficiency": [proficiency_bonus(level) for level in LEVELS],
+        "moves": {},
+        "pokemon": {}
+    }
+    for name, move in dataset.moves.items():
+        table = move_table(move)
+        if table:
+            tables["moves"][name] = table
+    for name, pokemon in dataset.pokemon.items():
+        table = pokemon_table(pokemon)
+        if table:
+            tables["pokemon"][name] = table
+    return tables
+
+
+def save(dataset, output_dir):
+    with (output_dir / "level_tables.json").open("w", encoding="utf-8") as fp:
+        json.dump(build(dataset), fp, ensure_ascii=False, separators=(",", ":"))
+    logging.debug("Saved level tables")
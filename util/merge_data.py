@@ -0,0 +1,123 @@
+import os
+import json
+import pickle
+import hashlib
+import logging
+
+# The files in assets/extra that are merged into the output, by the name util keeps their data under
+FILES = {
+    "MERGE_POKEMON_DATA": "pokemon",
+    "MERGE_EVOLVE_DATA": "evolve",
+    "MERGE_FILTER_DATA": "filter_data",
+    "MERGE_MOVE_DATA": "moves",
+    "MERGE_ABILITY_DATA": "abilities",
+    "VARIANT_DATA": "variants"
+}
+# Bump when the layout of the snapshot or the validation changes, older snapshots are then compiled again
+VERSION = 3
+
+
+class MergeDataError(Exception):
+    pass
+
+
+def validate_variants(variant_data):
+    for name, variant_poke_data in variant_data.items():
+        if not "create_mode" in variant_poke_data or not isinstance(variant_poke_data["create_mode"], str):
+            raise MergeDataError(f"Variant for species {name} does not specify 'create_mode' string")
+        if not "permanent" in variant_poke_data or not isinstance(variant_poke_data["permanent"], bool):
+            raise MergeDataError(f"Variant for species {name} does not specify 'permanent' bool")
+        if not "variants" in variant_poke_data or not isinstance(variant_poke_data["variants"], list):
+            raise MergeDataError(f"Variant for species {name} does not specify 'variants' list")
+        for this_variant_data in variant_poke_data["variants"]:
+            if not isinstance(this_variant_data, dict):
+                raise MergeDataError(f"A variant of species {name} is not an object")
+            for key in ("name", "variant_name"):
+                if not isinstance(this_variant_data.get(key), str):
+                    raise MergeDataError(f"A variant of species {name} does not specify '{key}' string")
+
+
+def validate(merge_data):
+    for name, file_name in FILES.items():
+        data = merge_data[name]
+        if not isinstance(data, dict):
+            raise MergeDataError(f"{file_name}.json does not contain an object")
+        for key, value in data.items():
+            # util.merge merges each value into a dict, the variants are read as one
+            if not isinstance(value, dict):
+                raise MergeDataError(f"{file_name}.json: '{key}' is not an object")
+    validate_variants(merge_data["VARIANT_DATA"])
+
+
+def _paths(extra_dir):
+    return {name: (extra_dir / file_name).with_suffix(".json") for name, file_name in FILES.items()}
+
+
+def _stats(paths):
+    stats = []
+    for path in paths.values():
+        stat = path.stat()
+        stats.append((path.name, stat.st_size, stat.st_mtime_ns))
+    return stats
+
+
+def _read(paths):
+    """The content of each file and a hash of all of them"""
+    contents = {name: path.read_bytes() for name, path in paths.items()}
+    content_hash = hashlib.blake2b(digest_size=16)
+    for name, content in contents.items():
+        content_hash.update(f"{name}:{len(content)}:".encode("utf-8"))
+        content_hash.update(content)
+    return contents, content_hash.hexdigest()
+
+
+def _read_snapshot(snapshot_path):
+    try:
+        with snapshot_path.open("rb") as fp:
+            snapshot = pickle.load(fp)
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get("version") != VERSION:
+        return None
+    return snapshot
+
+
+def _write_snapshot(snapshot_path, snapshot):
+    try:
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = snapshot_path.with_suffix(f".{os.getpid()}.tmp")
+        with temporary_path.open("wb") as fp:
+            pickle.dump(snapshot, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, snapshot_path)
+    except OSError as e:
+        logging.debug(f"Could not save the merge data snapshot: {e}")
+
+
+def compile_snapshot(extra_dir, snapshot_path):
+    """Reads and validates the merge data files and saves them as a snapshot, returns the merge data and its pickle"""
+    paths = _paths(extra_dir)
+    stats = _stats(paths)
+    contents, content_hash = _read(paths)
+    merge_data = {name: json.loads(content) for name, content in contents.items()}
+    validate(merge_data)
+    blob = pickle.dumps(merge_data, protocol=pickle.HIGHEST_PROTOCOL)
+    _write_snapshot(snapshot_path, {"version": VERSION, "stats": stats, "hash": content_hash, "data": blob})
+    logging.debug(f"Compiled the merge data snapshot {snapshot_path}")
+    return merge_data, blob
+
+
+def load(extra_dir, snapshot_path):
+    """The merge data in extra_dir by name and its pickle.
+
+    The validated merge data is kept as a pickle in snapshot_path, which is read in one go when the files haven't
+    changed since. When only their modification times changed, like after a checkout, the content hash decides."""
+    paths = _paths(extra_dir)
+    snapshot = _read_snapshot(snapshot_path)
+    if snapshot:
+        stats = _stats(paths)
+        if snapshot["stats"] == stats:
+            return pickle.loads(snapshot["data"]), snapshot["data"]
+        if _read(paths)[1] == snapshot["hash"]:
+            _write_snapshot(snapshot_path, dict(snapshot, stats=stats))
+            return pickle.loads(snapshot["data"]), snapshot["data"]
+    return compile_snapshot(extra_dir, snapshot_path)
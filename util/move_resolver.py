@@ -0,0 +1,95 @@
+import re
+import logging
+from collections import defaultdict
+
+try:
+    import scripts.source_data.util.registry as registry
+except ModuleNotFoundError:
+    from util import registry
+
+RE_SEPARATORS = re.compile(r"[\s\-_]+")
+APOSTROPHES = str.maketrans({"’": "'", "‘": "'", "`": "'", "´": "'"})
+
+# Learnset lists in the Pokemon output that contain move names
+LEARNSET_LISTS = ("Starting Moves", "egg")
+
+
+def normalize(name):
+    """Key used to match move names, ignores case, apostrophe variants and hyphens/whitespace"""
+    return RE_SEPARATORS.sub(" ", name.translate(APOSTROPHES).lower()).strip()
+
+
+def _ngrams(key, n=3):
+    padded = f"  {key} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class MoveIndex:
+    """Lookup of the converted move names, built once and shared by all Pokemon"""
+    SUGGESTION_COUNT = 3
+    SUGGESTION_MIN_SCORE = 0.3
+
+    def __init__(self, move_names):
+        self.canonical_by_key = {}
+        self.ngrams_by_name = {}
+        self.names_by_ngram = defaultdict(set)
+        for name in move_names:
+            key = normalize(name)
+            if key in self.canonical_by_key:
+                logging.warning(f"Moves '{self.canonical_by_key[key]}' and '{name}' have the same normalized name")
+                continue
+            self.canonical_by_key[key] = name
+
+            ngrams = _ngrams(key)
+            self.ngrams_by_name[name] = ngrams
+            for ngram in ngrams:
+                self.names_by_ngram[ngram].add(name)
+
+        self.report = {"resolved": 0, "corrected": {}, "unresolved": {}}
+
+    def resolve(self, name):
+        return self.canonical_by_key.get(normalize(name))
+
+    def suggest(self, name):
+        ngrams = _ngrams(normalize(name))
+        shared = defaultdict(int)
+        for ngram in ngrams:
+            for candidate in self.names_by_ngram.get(ngram, ()):
+                shared[candidate] += 1
+
+        scored = []
+        for candidate, count in shared.items():
+            score = count / (len(ngrams) + len(self.ngrams_by_name[candidate]) - count)
+            if score >= self.SUGGESTION_MIN_SCORE:
+                scored.append((score, candidate))
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return [candidate for _, candidate in scored[:self.SUGGESTION_COUNT]]
+
+    def _resolve_list(self, species, moves):
+        for index, name in enumerate(moves):
+            if not name:
+                continue
+            canonical = self.resolve(name)
+            if canonical is None:
+                self.report["unresolved"].setdefault(species, {})[name] = self.suggest(name)
+                continue
+            self.report["resolved"] += 1
+            if canonical != name:
+                self.report["corrected"].setdefault(species, {})[name] = canonical
+                moves[index] = canonical
+
+    def resolve_pokemon(self, species, output_data):
+        """Replace all move names in the Pokemon's learnsets with the names used by the move output"""
+        moves = output_data.get("Moves", {})
+        for key in LEARNSET_LISTS:
+            if moves.get(key):
+                self._resolve_list(species, moves[key])
+        for level_moves in moves.get("Level", {}).values():
+            self._resolve_list(species, level_moves)
+
+
+def _index_stage(rows, inputs, options, report):
+    return {"move_index": MoveIndex(inputs["moves"])}
+
+
+registry.register(registry.Stage("move_index", _index_stage, inputs=("moves",), provides=("move_index",)))
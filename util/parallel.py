@@ -0,0 +1,41 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import scripts.source_data.util.util as util
+except ModuleNotFoundError:
+    from util import util
+
+# Set once in each worker process by _init_worker, read by the functions running in the workers
+state = {}
+
+
+def _init_worker(merge_data_blob, worker_state):
+    util.set_merge_data_blob(merge_data_blob)
+    state.update(worker_state)
+
+
+def map_chunks(function, rows, jobs, report=None, **worker_state):
+    """Runs function over chunks of rows in `jobs` worker processes, returning all results in row order.
+
+    function takes a list of rows and returns a list of results, it finds `worker_state` and the merge data of this
+    process in the worker, they are sent once per worker instead of with every chunk. The merge data is sent already
+    pickled, so workers don't parse or validate it again. `report` advances as the
+    chunks come back."""
+    rows = list(rows)
+    if not rows:
+        return []
+    # A few chunks per worker evens out the load without paying for a round trip per row
+    chunk_size = max(len(rows) // (jobs * 4), 1)
+    chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+
+    # Spawn rather than fork, the conversion can run next to the download threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=_init_worker,
+                             initargs=(util.get_merge_data_blob(), worker_state)) as executor:
+        results = []
+        for chunk, chunk_results in zip(chunks, executor.map(function, chunks)):
+            results.extend(chunk_results)
+            if report:
+                report.advance(len(chunk))
+        return results
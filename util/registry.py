@@ -0,0 +1,149 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+try:
+    import scripts.source_data.util.reporting as reporting
+except ModuleNotFoundError:
+    from util import reporting
+
+
+class Stage:
+    """One step of the conversion.
+
+    A stage either converts the rows of a `sheet` or, without a sheet, combines what other stages made. It runs once
+    everything in `inputs` is there and everything in `optional_inputs` is there or won't be made, and it is skipped
+    when an input won't be made. `convert(rows, inputs, options, report)` returns a dict with its `outputs`, which end
+    up in the dataset, and what it `provides` to other stages only. `report` is the reporting.SheetReport of the
+    stage."""
+    def __init__(self, name, convert, sheet=None, inputs=(), optional_inputs=(), outputs=(), provides=()):
+        self.name = name
+        self.convert = convert
+        self.sheet = sheet
+        self.inputs = tuple(inputs)
+        self.optional_inputs = tuple(optional_inputs)
+        self.outputs = tuple(outputs)
+        self.provides = tuple(provides)
+
+
+# Registered stages by name, in registration order
+_stages = {}
+
+
+def register(stage):
+    """Adds a stage, replacing a registered stage with the same name"""
+    made = stage.outputs + stage.provides
+    for other in _stages.values():
+        if other.name == stage.name:
+            continue
+        if other.sheet and other.sheet == stage.sheet:
+            raise ValueError(f"Stages {other.name} and {stage.name} both convert {stage.sheet}")
+        for name in made:
+            if name in other.outputs + other.provides:
+                raise ValueError(f"Stages {other.name} and {stage.name} both make {name}")
+    _stages[stage.name] = stage
+    return stage
+
+
+def stages():
+    return list(_stages.values())
+
+
+def sheets():
+    return tuple(sorted(stage.sheet for stage in _stages.values() if stage.sheet))
+
+
+def plan(stages, sheets):
+    """Names of the stages that will run when only the given sheets are converted"""
+    maker = {name: stage.name for stage in stages for name in stage.outputs + stage.provides}
+    planned = set()
+    changed = True
+    while changed:
+        changed = False
+        for stage in stages:
+            if stage.name in planned or (stage.sheet and stage.sheet not in sheets):
+                continue
+            if all(maker.get(x) in planned for x in stage.inputs):
+                planned.add(stage.name)
+                changed = True
+    return planned
+
+
+class Scheduler:
+    """Runs the stages in threads, each as soon as its sheet has been added and its inputs are there.
+
+    Which stages will run is planned from the `expected` sheets, `finish` waits for all of them and then runs what
+    was waiting on sheets that never came. `on_done(stage, results, warnings)` is called in the thread of each
+    stage when it is done."""
+    def __init__(self, stages, expected, options, on_done):
+        self.stages = list(stages)
+        self.options = options
+        self.on_done = on_done
+        self.expected = set(expected)
+        self._maker = {name: stage.name for stage in self.stages for name in stage.outputs + stage.provides}
+        self._planned = plan(self.stages, self.expected)
+        self._rows = {}
+        self._values = {}
+        self._started = set()
+        self._futures = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=len(self.stages) or 1)
+
+    def add(self, sheet, rows):
+        with self._lock:
+            if sheet not in self.expected:
+                self.expected.add(sheet)
+                self._planned = plan(self.stages, self.expected)
+            self._rows[sheet] = rows
+            self._schedule()
+
+    def _ready(self, stage):
+        if stage.name in self._started or stage.name not in self._planned:
+            return False
+        if stage.sheet and stage.sheet not in self._rows:
+            return False
+        if not all(x in self._values for x in stage.inputs):
+            return False
+        return all(x in self._values or self._maker.get(x) not in self._planned for x in stage.optional_inputs)
+
+    def _schedule(self):
+        # Called with the lock held
+        for stage in self.stages:
+            if self._ready(stage):
+                self._started.add(stage.name)
+                inputs = {x: self._values.get(x) for x in stage.inputs + stage.optional_inputs}
+                rows = self._rows.pop(stage.sheet) if stage.sheet else None
+                self._futures.append(self._executor.submit(self._run, stage, rows, inputs))
+
+    def _run(self, stage, rows, inputs):
+        logging.debug(f"Starting {stage.name}")
+        report = reporting.SheetReport(stage.name)
+        results = stage.convert(rows, inputs, self.options, report)
+        warnings = report.finish()
+        self.on_done(stage, results, warnings)
+        with self._lock:
+            self._values.update(results)
+            self._schedule()
+
+    def _wait(self):
+        while True:
+            with self._lock:
+                pending = [x for x in self._futures if not x.done()]
+            if not pending:
+                break
+            wait(pending)
+        for future in self._futures:
+            # Raises the first exception of a stage
+            future.result()
+
+    def finish(self):
+        try:
+            self._wait()
+            with self._lock:
+                # Sheets that were expected but never added won't come anymore
+                self.expected = set(self._rows) | {x.sheet for x in self.stages if x.name in self._started and x.sheet}
+                self._planned = plan(self.stages, self.expected)
+                self._schedule()
+            self._wait()
+        finally:
+            self._executor.shutdown()
@@ -0,0 +1,98 @@
+import json
+import time
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+
+LEVEL_NAMES = {
+    logging.DEBUG: "debug",
+    logging.INFO: "info",
+    logging.WARNING: "warning",
+    logging.ERROR: "error",
+    logging.CRITICAL: "critical"
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, the `fields` given through `extra` are added to it"""
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": LEVEL_NAMES.get(record.levelno, str(record.levelno)),
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def configure(level=logging.INFO, json_output=False):
+    handler = logging.StreamHandler()
+    if json_output:
+        handler.setFormatter(JsonFormatter())
+    logging.basicConfig(level=level, handlers=[handler], force=True)
+
+
+class SheetReport:
+    """Progress and warnings of converting one sheet.
+
+    Warnings about single rows are counted by kind and only the first few examples of each are kept, they are logged
+    together when the sheet is done. Progress is logged at most once every `interval` seconds."""
+    EXAMPLES = 3
+
+    def __init__(self, sheet, total=None, interval=5.0):
+        self.sheet = sheet
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.warnings = Counter()
+        self.examples = {}
+        self.start_time = time.monotonic()
+        self._next_log = self.start_time + interval
+
+    def warn(self, kind, example):
+        self.warnings[kind] += 1
+        examples = self.examples.setdefault(kind, [])
+        if len(examples) < self.EXAMPLES:
+            examples.append(example)
+
+    def add_warnings(self, warnings):
+        for kind, example in warnings:
+            self.warn(kind, example)
+
+    def advance(self, rows=1):
+        self.done += rows
+        now = time.monotonic()
+        if now >= self._next_log:
+            self._next_log = now + self.interval
+            self._log_progress(now - self.start_time)
+
+    def _log_progress(self, elapsed):
+        rate = self.done / elapsed if elapsed else 0
+        fields = {"sheet": self.sheet, "rows": self.done, "rows_per_second": round(rate, 1)}
+        if self.total and rate:
+            eta = (self.total - self.done) / rate
+            fields.update({"total": self.total, "eta_seconds": round(eta, 1)})
+            message = f"{self.sheet}: {self.done}/{self.total} rows, {rate:.0f} rows/s, ETA {eta:.0f}s"
+        else:
+            message = f"{self.sheet}: {self.done} rows, {rate:.0f} rows/s"
+        logging.info(message, extra={"fields": fields})
+
+    def finish(self):
+        """Logs the warnings and a summary of the sheet, returns the warning counts"""
+        elapsed = time.monotonic() - self.start_time
+        for kind, count in self.warnings.items():
+            logging.warning(f"{self.sheet}: {count} x {kind}, e.g. {'; '.join(self.examples[kind])}",
+                            extra={"fields": {"sheet": self.sheet, "warning": kind, "count": count,
+                                              "examples": self.examples[kind]}})
+        if not self.done and self.total is None:
+            # Stages that don't go through rows
+            logging.debug(f"Finished {self.sheet} in {elapsed:.2f}s")
+            return dict(self.warnings)
+        rate = self.done / elapsed if elapsed else 0
+        logging.info(f"Converted {self.sheet}: {self.done} rows in {elapsed:.2f}s ({rate:.0f} rows/s)",
+                     extra={"fields": {"sheet": self.sheet, "rows": self.done, "seconds": round(elapsed, 3),
+                                       "rows_per_second": round(rate, 1), "warnings": sum(self.warnings.values())}})
+        return dict(self.warnings)
@@ -0,0 +1,110 @@
+import json
+import logging
+from pathlib import Path
+
+try:
+    import scripts.source_data.converters.pokemon as pokemon
+    import scripts.source_data.util.bundle as bundle
+    import scripts.source_data.util.level_tables as level_tables
+    import scripts.source_data.util.parallel as parallel
+    import scripts.source_data.util.sqlite_export as sqlite_export
+except ModuleNotFoundError:
+    import converters.pokemon as pokemon
+    import util.bundle as bundle
+    import util.level_tables as level_tables
+    import util.parallel as parallel
+    import util.sqlite_export as sqlite_export
+
+
+def _encode(data, sort_keys=False):
+    return json.dumps(data, ensure_ascii=False, indent="  ", sort_keys=sort_keys)
+
+
+def _dump(data, path, sort_keys=False):
+    with path.open("w", encoding="utf-8") as fp:
+        fp.write(_encode(data, sort_keys))
+
+
+def _encode_records_chunk(records):
+    return [_encode(data, sort_keys=True) for data in records]
+
+
+class JsonSink:
+    """Writes the dataset in the layout the app reads, one file per Pokemon and move plus the shared files.
+
+    With `jobs` above 1 the Pokemon and move files are encoded in that many worker processes, only writing them
+    happens in this one."""
+    def __init__(self, output_dir, jobs=1):
+        self.output_dir = Path(output_dir)
+        self.jobs = jobs
+
+    def _write_records(self, records):
+        # records are (path, data) pairs
+        paths = [path for path, _ in records]
+        data = [data for _, data in records]
+        if self.jobs > 1:
+            texts = parallel.map_chunks(_encode_records_chunk, data, self.jobs)
+        else:
+            texts = _encode_records_chunk(data)
+        for path, text in zip(paths, texts):
+            with path.open("w", encoding="utf-8") as fp:
+                fp.write(text)
+
+    def write(self, dataset):
+        moves_dir = self.output_dir / "moves"
+        pokemon_dir = self.output_dir / "pokemon"
+        moves_dir.mkdir(parents=True, exist_ok=True)
+        pokemon_dir.mkdir(parents=True, exist_ok=True)
+
+        records = []
+        if "MDATA" in dataset.sheets:
+            records.extend((moves_dir / (name + ".json"), data) for name, data in dataset.moves.items())
+        if "PDATA" in dataset.sheets:
+            records.extend((pokemon_dir / (pokemon.clean_file_name(name) + ".json"), data)
+                           for name, data in dataset.pokemon.items())
+        self._write_records(records)
+
+        if "MDATA" in dataset.sheets:
+            move_list = {name: {} for name in dataset.moves}
+            move_list["Error"] = {}
+            _dump(move_list, self.output_dir / "move_index.json")
+
+        if "PDATA" in dataset.sheets:
+            if dataset.variant_map is not None:
+                _dump(dataset.variant_map, self.output_dir / "variant_map.json")
+            _dump(dataset.evolve, self.output_dir / "evolve.json")
+            _dump(dataset.filter_data, self.output_dir / "filter_data.json")
+            _dump(dataset.index_order, self.output_dir / "index_order.json")
+
+        if dataset.move_report:
+            _dump(dataset.move_report, self.output_dir / "move_report.json", sort_keys=True)
+        if "IDATA" in dataset.sheets:
+            _dump(dataset.items, self.output_dir / "items.json", sort_keys=True)
+        if "TDATA" in dataset.sheets:
+            _dump(dataset.abilities, self.output_dir / "abilities.json", sort_keys=True)
+        logging.debug(f"Saved JSON output to {self.output_dir}")
+
+
+class LevelTablesSink:
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+
+    def write(self, dataset):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        level_tables.save(dataset, self.output_dir)
+
+
+class SqliteSink:
+    def __init__(self, output_file):
+        self.output_file = output_file
+
+    def write(self, dataset):
+        sqlite_export.export(self.output_file, dataset)
+
+
+class BundleSink:
+    def __init__(self, output_file):
+        self.output_file = output_file
+
+    def write(self, dataset):
+        bundle.write_bundle(self.output_file, dataset)
@@ -0,0 +1,226 @@
+import os
+import json
+import sqlite3
+import logging
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE species (
+    name TEXT PRIMARY KEY,
+    idx INTEGER,
+    sr REAL,
+    ac INTEGER,
+    hit_dice INTEGER,
+    hp INTEGER,
+    min_lvl_fd INTEGER,
+    size TEXT,
+    hidden_ability TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE species_types (
+    species TEXT NOT NULL REFERENCES species(name),
+    slot INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    PRIMARY KEY (species, slot)
+);
+CREATE TABLE species_abilities (
+    species TEXT NOT NULL REFERENCES species(name),
+    ability TEXT NOT NULL,
+    hidden INTEGER NOT NULL
+);
+CREATE TABLE moves (
+    name TEXT PRIMARY KEY,
+    type TEXT,
+    pp TEXT,
+    move_time TEXT,
+    duration TEXT,
+    range TEXT,
+    save TEXT,
+    atk INTEGER,
+    data TEXT NOT NULL
+);
+CREATE TABLE learnsets (
+    species TEXT NOT NULL REFERENCES species(name),
+    method TEXT NOT NULL,
+    level INTEGER,
+    move TEXT NOT NULL
+);
+CREATE TABLE learnsets_tm (
+    species TEXT NOT NULL REFERENCES species(name),
+    tm INTEGER NOT NULL,
+    PRIMARY KEY (species, tm)
+);
+CREATE TABLE evolutions (
+    species TEXT PRIMARY KEY,
+    current_stage INTEGER,
+    total_stages INTEGER,
+    level INTEGER,
+    points INTEGER,
+    move TEXT
+);
+CREATE TABLE evolutions_into (
+    species TEXT NOT NULL,
+    evolves_into TEXT NOT NULL
+);
+CREATE TABLE variants (
+    species TEXT NOT NULL REFERENCES species(name),
+    variant TEXT NOT NULL,
+    display TEXT,
+    original_species TEXT,
+    is_default INTEGER NOT NULL,
+    diff TEXT,
+    PRIMARY KEY (species, variant)
+);
+CREATE TABLE abilities (
+    name TEXT PRIMARY KEY,
+    description TEXT
+);
+CREATE TABLE items (
+    name TEXT PRIMARY KEY,
+    effect TEXT
+);
+"""
+
+# Indexes are created after the bulk insert, building them up front only slows the inserts down
+INDEXES = """
+CREATE INDEX idx_species_index ON species(idx);
+CREATE INDEX idx_species_sr ON species(sr);
+CREATE INDEX idx_species_types_type ON species_types(type);
+CREATE INDEX idx_species_abilities_ability ON species_abilities(ability);
+CREATE INDEX idx_species_abilities_species ON species_abilities(species);
+CREATE INDEX idx_moves_type ON moves(type);
+CREATE INDEX idx_learnsets_species ON learnsets(species, method);
+CREATE INDEX idx_learnsets_move ON learnsets(move);
+CREATE INDEX idx_learnsets_tm_tm ON learnsets_tm(tm);
+CREATE INDEX idx_evolutions_into_species ON evolutions_into(species);
+CREATE INDEX idx_evolutions_into_into ON evolutions_into(evolves_into);
+CREATE INDEX idx_variants_original ON variants(original_species);
+"""
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+
+def _species_rows(pokemon):
+    for name, data in pokemon.items():
+        yield (name, data.get("index"), data.get("SR"), data.get("AC"), data.get("Hit Dice"), data.get("HP"),
+               data.get("MIN LVL FD"), data.get("size"), data.get("Hidden Ability"), _dumps(data))
+
+
+def _type_rows(pokemon):
+    for name, data in pokemon.items():
+        for slot, _type in enumerate(data.get("Type") or []):
+            yield name, slot, _type
+
+
+def _ability_rows(pokemon):
+    for name, data in pokemon.items():
+        for ability in data.get("Abilities") or []:
+            yield name, ability, 0
+        if data.get("Hidden Ability"):
+            yield name, data["Hidden Ability"], 1
+
+
+def _learnset_rows(pokemon):
+    for name, data in pokemon.items():
+        moves = data.get("Moves", {})
+        for move in moves.get("Starting Moves") or []:
+            yield name, "starting", None, move
+        for level, level_moves in moves.get("Level", {}).items():
+            for move in level_moves:
+                yield name, "level", int(level), move
+        for move in moves.get("egg") or []:
+            yield name, "egg", None, move
+
+
+def _tm_rows(pokemon):
+    for name, data in pokemon.items():
+        for tm in set(data.get("Moves", {}).get("TM") or []):
+            yield name, tm
+
+
+def _move_rows(moves):
+    for name, data in moves.items():
+        pp = data.get("PP")
+        atk = data.get("atk")
+        yield (name, data.get("Type"), None if pp is None else str(pp), data.get("Move Time"), data.get("Duration"),
+               data.get("Range"), data.get("Save"), None if atk is None else int(atk), _dumps(data))
+
+
+def _evolution_rows(evolve):
+    for name, data in evolve.items():
+        yield (name, data.get("current_stage"), data.get("total_stages"), data.get("level"), data.get("points"),
+               data.get("move"))
+
+
+def _evolution_into_rows(evolve):
+    for name, data in evolve.items():
+        for into in data.get("into", []):
+            yield name, into
+
+
+def _variant_rows(pokemon):
+    for name, data in pokemon.items():
+        if "variant_data" not in data:
+            continue
+        default = data["variant_data"].get("default")
+        for variant, variant_data in data["variant_data"]["variants"].items():
+            diff = variant_data.get("diff")
+            yield (name, variant, variant_data.get("display"), variant_data.get("original_species"),
+                   int(variant == default), None if diff is None else _dumps(diff))
+
+
+def _write(database_file, dataset):
+    pokemon = dataset.pokemon
+    evolve = dataset.evolve
+    moves = dataset.moves
+    abilities = dataset.abilities
+    items = dataset.items
+
+    connection = sqlite3.connect(database_file, isolation_level=None)
+    try:
+        # No journal, a failed export only leaves a temporary file behind that is removed anyway
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        # Everything, including the indexes, is written in one transaction
+        connection.executescript("BEGIN;" + SCHEMA)
+        connection.executemany("INSERT INTO species VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", _species_rows(pokemon))
+        connection.executemany("INSERT INTO species_types VALUES (?, ?, ?)", _type_rows(pokemon))
+        connection.executemany("INSERT INTO species_abilities VALUES (?, ?, ?)", _ability_rows(pokemon))
+        connection.executemany("INSERT INTO learnsets VALUES (?, ?, ?, ?)", _learnset_rows(pokemon))
+        connection.executemany("INSERT INTO learnsets_tm VALUES (?, ?)", _tm_rows(pokemon))
+        connection.executemany("INSERT INTO variants VALUES (?, ?, ?, ?, ?, ?)", _variant_rows(pokemon))
+        connection.executemany("INSERT INTO moves VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", _move_rows(moves))
+        connection.executemany("INSERT INTO evolutions VALUES (?, ?, ?, ?, ?, ?)", _evolution_rows(evolve))
+        connection.executemany("INSERT INTO evolutions_into VALUES (?, ?)", _evolution_into_rows(evolve))
+        connection.executemany("INSERT INTO abilities VALUES (?, ?)",
+                               ((name, data.get("Description")) for name, data in abilities.items()))
+        connection.executemany("INSERT INTO items VALUES (?, ?)",
+                               ((name, data.get("Effect")) for name, data in items.items()))
+        # executescript() would commit the pending transaction, so the indexes are created one by one
+        for statement in INDEXES.strip().splitlines():
+            connection.execute(statement)
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
+
+
+def export(output_file, dataset):
+    """Write the converted dataset into a single SQLite database, replacing any existing file.
+
+    The database is built in a temporary file next to output_file, which only replaces it once everything has been
+    written, so a failed export leaves any previous file as it was."""
+    output_file = Path(output_file)
+    temporary_file = output_file.with_name(f".{output_file.name}.{os.getpid()}.tmp")
+    if temporary_file.exists():
+        temporary_file.unlink()
+
+    try:
+        _write(temporary_file, dataset)
+        os.replace(temporary_file, output_file)
+    except BaseException:
+        if temporary_file.exists():
+            temporary_file.unlink()
+        raise
+    logging.debug(f"Exported SQLite database to {output_file}")
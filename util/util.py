@@ -1,8 +1,16 @@
-import json
+import csv
+import copy
+import pickle
+import threading
 from pathlib import Path
-import sys
+from functools import lru_cache
 import logging
 
+try:
+    import scripts.source_data.util.merge_data as merge_data
+except ModuleNotFoundError:
+    from util import merge_data
+
 # Add some colors to the logging output
 logging.addLevelName(logging.DEBUG, "\x1b[38;21m%s\033[1;0m" % logging.getLevelName(logging.DEBUG))
 logging.addLevelName(logging.INFO, "\x1b[1;32m%s\033[1;0m" % logging.getLevelName(logging.INFO))
@@ -32,6 +40,10 @@ class _Paths:
     def ASSETS(self):
         return self.ROOT / "assets"
 
+    @property
+    def MERGE_DATA_SNAPSHOT(self):
+        return self.ROOT / ".cache" / "merge_data.pickle"
+
     @property
     def MOVES_OUTPUT(self):
         return self.OUTPUT / "moves"
@@ -57,35 +69,60 @@ ATTRIBUTES_FULL = [
 ]
 
 
-def __load(path):
-    with path.open(encoding="utf-8") as fp:
-        json_data = json.load(fp)
-    return json_data
+# Data holders that's read in to memory for simplicity, from the merge data snapshot the first time one is used
+MERGE_DATA_NAMES = tuple(merge_data.FILES)
+_merge_data_lock = threading.Lock()
+_merge_data_blob = None
+
+
+def _load_merge_data():
+    global _merge_data_blob
+    with _merge_data_lock:
+        if "VARIANT_DATA" not in globals():
+            data, _merge_data_blob = merge_data.load(Paths.ASSETS / "extra", Paths.MERGE_DATA_SNAPSHOT)
+            globals().update(data)
+
 
+def __getattr__(name):
+    if name in MERGE_DATA_NAMES:
+        _load_merge_data()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-def load_extra(name):
-    p = Path(Paths.ASSETS / "extra" / name).with_suffix(".json")
-    return __load(p)
 
+def get_merge_data():
+    _load_merge_data()
+    return {name: globals()[name] for name in MERGE_DATA_NAMES}
 
-# Data holders that's read in to memory for simplicity
-MERGE_POKEMON_DATA = load_extra("pokemon")
-MERGE_EVOLVE_DATA = load_extra("evolve")
-MERGE_FILTER_DATA = load_extra("filter_data")
-MERGE_MOVE_DATA = load_extra("moves")
-MERGE_ABILITY_DATA = load_extra("abilities")
-VARIANT_DATA = load_extra("variants")
 
-options = {"remove_dice": False, "output": False}
+def get_merge_data_blob():
+    """The merge data pickled, to hand it to worker processes"""
+    global _merge_data_blob
+    data = get_merge_data()
+    with _merge_data_lock:
+        if _merge_data_blob is None:
+            _merge_data_blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        return _merge_data_blob
 
 
-def update_options(_options):
-    merge(options, _options)
-    Paths.OUTPUT = _options["output"] if _options["output"] else Paths.OUTPUT
+def set_merge_data_blob(blob):
+    """Replaces the merge data with the result of get_merge_data_blob in another process"""
+    global _merge_data_blob
+    data = pickle.loads(blob)
+    with _merge_data_lock:
+        globals().update((name, data[name]) for name in MERGE_DATA_NAMES)
+        _merge_data_blob = blob
+
+DEFAULT_OPTIONS = {"remove_dice": False, "variants": True, "jobs": 1}
+
+
+def conversion_options(options=None):
+    """The default conversion options updated with options"""
+    return dict(DEFAULT_OPTIONS, **(options or {}))
 
 
 def merge(a, b, path=None):
-    """merges b into a"""
+    """merges b into a, values from b are copied so the merge data is never changed through a"""
     if path is None: path = []
     for key in b:
         if key in a:
@@ -94,10 +131,10 @@ def merge(a, b, path=None):
             elif a[key] == b[key]:
                 pass  # same value
             else:  # Overwrite value
-                a[key] = b[key]
+                a[key] = copy.deepcopy(b[key])
                 # raise Exception('Conflict at %s' % '.'.join(path + [str(key)]))
         else:
-            a[key] = b[key]
+            a[key] = copy.deepcopy(b[key])
     return a
 
 def diff_dict(base, other):
@@ -115,24 +152,65 @@ def diff_dict(base, other):
                     diff[k] = v
     return diff
 
-def update_progress(progress):
-    bar_length = 50  # Modify this to change the length of the progress bar
-    status = ""
-    if isinstance(progress, int):
-        progress = float(progress)
-    if not isinstance(progress, float):
-        progress = 0
-        status = "error: progress var must be float\r\n"
-    if progress < 0:
-        progress = 0
-        status = "Halt...\r\n"
-    if progress >= 1:
-        progress = 1
-        status = "Done...\r\n"
-    block = int(round(bar_length*progress))
-    text = "\rPercent: [{}] {:.1f}% {}".format("#"*block + "-"*(bar_length-block), progress*100, status)
-    sys.stdout.write(text)
-    sys.stdout.flush()
+def diff_fields(old, new):
+    """Every leaf that differs between old and new as a list of {"path", "old", "new"}, keys missing on one side
+    have None there. Nested dicts are walked, anything else is compared as a whole"""
+    changes = []
+    stack = [("", old, new)]
+    while stack:
+        path, a, b = stack.pop()
+        if type(a) is dict and type(b) is dict:
+            for key in reversed(list(a.keys() | b.keys())):
+                key_path = f"{path}.{key}" if path else str(key)
+                stack.append((key_path, a.get(key), b.get(key)))
+        elif a != b:
+            changes.append({"path": path, "old": a, "new": b})
+    changes.sort(key=lambda x: x["path"])
+    return changes
+
+
+# Applied to every string value, replaces the typographic apostrophe used in the sheets
+TEXT_TABLE = str.maketrans({"’": "'"})
+
+
+@lru_cache(maxsize=None)
+def header_map(header):
+    """Maps each column name in header, a tuple, to its index, duplicated names keep the first index like
+    header.index"""
+    columns = {}
+    for index, name in enumerate(header):
+        columns.setdefault(name, index)
+    return columns
+
+
+def _sniff_dialect(sample):
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t").delimiter
+    except csv.Error:
+        delimiter = ","
+
+    # Only trust the sniffed delimiter, the descriptions contain enough ' to confuse the quote detection
+    class Dialect(csv.excel):
+        pass
+    Dialect.delimiter = delimiter
+    return Dialect
+
+
+def sheet_rows(rows):
+    """Skips the header row and empty rows, yielding each row as a tuple"""
+    rows = iter(rows)
+    next(rows, None)
+    for row in rows:
+        if row:
+            yield tuple(row)
+
+
+def read_sheet(input_csv):
+    """Reads a downloaded sheet, see sheet_rows"""
+    with open(input_csv, "r", encoding="utf-8") as fp:
+        dialect = _sniff_dialect(fp.read(4096))
+        fp.seek(0)
+        yield from sheet_rows(csv.reader(fp, dialect))
 
 
 def ensure_int(value):
@@ -151,11 +229,12 @@ def ensure_float(value):
     return None
 
 
+@lru_cache(maxsize=8192)
 def ensure_string(value):
     if value == "#N/A":
         return None
     if value and value != "None":
-        return value.strip('"').strip().replace("’", "'")
+        return value.strip('"').strip().translate(TEXT_TABLE)
     return None
 
 
@@ -167,17 +246,36 @@ def ensure_list(value, sep=','):
     return None
 
 
+# Cleanup rules, used to declare how each field of a record should be cleaned
+CLEAN_ITEMS = 1  # Remove empty and "None" items from a list
+DROP_EMPTY = 2   # Remove the field if it is empty after cleaning
+
+
 def clean_object(obj):
     if not obj:
         return
-    for index in range(len(obj))[::-1]:
-        if not obj[index] or obj[index] == "None":
-            del obj[index]
+    obj[:] = [x for x in obj if x and x != "None"]
+
 
+def clean_dict(d, rules=None):
+    """Removes None values from d and all nested dicts in place, applying the cleanup rules on the way.
 
-def clean_dict(d):
-    if type(d) is dict:
-        return dict((k, clean_dict(v)) for k, v in d.items() if v is not None)
-        # return {k: v for k, clean_output(v) in d.items() if v is not None}
-    else:
+    `rules` mirrors the structure of d, each key maps to a combination of CLEAN_ITEMS and DROP_EMPTY or to the
+    rules for a nested dict."""
+    if type(d) is not dict:
         return d
+    remove = []
+    for key, value in d.items():
+        if value is None:
+            remove.append(key)
+            continue
+        rule = rules.get(key, 0) if rules else 0
+        if type(value) is dict:
+            clean_dict(value, rule if type(rule) is dict else None)
+        elif type(rule) is int and rule & CLEAN_ITEMS:
+            clean_object(value)
+        if type(rule) is int and rule & DROP_EMPTY and not value:
+            remove.append(key)
+    for key in remove:
+        del d[key]
+    return d